@@ -0,0 +1,22 @@
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comment_count': post.comment_count,
+    }
+
+
+def serialize_post_detail(post):
+    data = serialize_post(post)
+    data.update({
+        'author_name': post.author.get_full_name(),
+        'updated': post.updated.isoformat(),
+        'thumbnail': (
+            post.image_thumbnail.url if post.image_thumbnail else None
+        ),
+    })
+    return data
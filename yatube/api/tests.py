@@ -0,0 +1,148 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(3):
+            Post.objects.create(
+                text=f'Тестовый пост-{i}',
+                author=cls.author,
+                group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_return_compact_json(self):
+        """Ленты отдают посты в JSON от новых к старым"""
+        urls = [
+            reverse('api:post_list'),
+            reverse('api:group_posts', args=[self.group.slug]),
+            reverse('api:profile_posts', args=[self.author.username]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertEqual(
+                    [post['text'] for post in data['results']],
+                    ['Тестовый пост-2', 'Тестовый пост-1', 'Тестовый пост-0']
+                )
+                self.assertEqual(data['results'][0]['author'], 'author')
+                self.assertEqual(data['results'][0]['group'], 'test_slug')
+                self.assertIsNone(data['next'])
+
+    def test_feed_pages_by_cursor(self):
+        """Ссылка next ведет на следующую страницу ленты"""
+        with mock.patch('posts.constants.POST_PER_PAGE', 2):
+            data = self.client.get(reverse('api:post_list')).json()
+            self.assertEqual(len(data['results']), 2)
+            data = self.client.get(data['next']).json()
+        self.assertEqual(
+            [post['text'] for post in data['results']], ['Тестовый пост-0']
+        )
+        self.assertIsNone(data['next'])
+
+    def test_unchanged_feed_returns_304_without_queries(self):
+        """Неизменная лента отдает 304 без запросов к базе"""
+        url = reverse('api:post_list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_etag_follows_comments(self):
+        """ETag поста меняется после нового комментария"""
+        post = Post.objects.latest('pk')
+        url = reverse('api:post_detail', args=[post.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['comment_count'], 0)
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            data={'text': 'Комментарий'}
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comment_count'], 1)
+
+    def test_post_detail_etag_follows_author(self):
+        """ETag поста меняется вместе с именем автора"""
+        author = User.objects.create_user(username='renamed_author')
+        post = Post.objects.create(text='Пост', author=author)
+        url = reverse('api:post_detail', args=[post.pk])
+        etag = self.client.get(url)['ETag']
+        author.first_name = 'Новое'
+        author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['author_name'], 'Новое')
+
+    def test_list_etags_follow_comments(self):
+        """ETag списков постов меняется после нового комментария"""
+        post = Post.objects.latest('pk')
+        urls = [
+            reverse('api:post_list'),
+            reverse('api:group_posts', args=[self.group.slug]),
+            reverse('api:profile_posts', args=[self.author.username]),
+        ]
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            data={'text': 'Комментарий'}
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json()['results'][0]['comment_count'], 1
+                )
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок требует авторизации и учитывает подписки"""
+        url = reverse('api:follow_posts')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 401)
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 3)
+
+    def test_missing_objects_return_json_404(self):
+        """Несуществующие объекты отдают 404 в JSON"""
+        urls = [
+            reverse('api:post_detail', args=[0]),
+            reverse('api:group_posts', args=['missing']),
+            reverse('api:profile_posts', args=['missing']),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
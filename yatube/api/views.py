@@ -0,0 +1,124 @@
+from functools import wraps
+
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_GET
+
+from core import db
+from posts import constants
+from posts.caching import (get_generation, group_scope, hashed, index_scope,
+                           post_page_scopes, profile_scope)
+from posts.feed import feed_for
+from posts.groups import get_group
+from posts.models import Post, User
+from posts.utils import KeysetPaginator
+
+from .serializers import serialize_post, serialize_post_detail
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def error(detail, status):
+    return json_response({'detail': detail}, status=status)
+
+
+def generation_etag(scopes_func):
+    """ETag из поколений кеша: пока посты области не менялись,
+    повторный запрос получает 304 без обращений к базе.
+
+    Ответ с ETag читается с основной базы: реплика могла еще
+    не получить запись, сдвинувшую поколение.
+    """
+    def etag(request, *args, **kwargs):
+        scopes = scopes_func(request, **kwargs)
+        if scopes is None:
+            return None
+        versions = ':'.join(
+            f'{scope}={get_generation(scope)}' for scope in scopes
+        )
+        return hashed(f'{versions}:{request.get_full_path()}')
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with db.primary():
+                return conditional_view(request, *args, **kwargs)
+        return require_GET(wrapper)
+    return decorator
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Требуется авторизация', 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    return request.build_absolute_uri(f'{request.path}?cursor={cursor}')
+
+
+def paginated(request, post_list):
+    paginator = KeysetPaginator(
+        post_list.for_list(),
+        constants.POST_PER_PAGE
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    return json_response({
+        'results': [serialize_post(post) for post in page],
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    })
+
+
+@generation_etag(lambda request: [index_scope()])
+def post_list(request):
+    return paginated(request, Post.objects.all())
+
+
+@generation_etag(lambda request, post_id: post_page_scopes(post_id))
+def post_detail(request, post_id):
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    if post is None:
+        return error('Пост не найден', 404)
+    return json_response(serialize_post_detail(post))
+
+
+@generation_etag(lambda request, slug: [group_scope(slug)])
+def group_posts(request, slug):
+    group = get_group(slug)
+    if group is None:
+        return error('Группа не найдена', 404)
+    return paginated(request, group.posts.all())
+
+
+@generation_etag(lambda request, username: [profile_scope(username)])
+def profile_posts(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error('Пользователь не найден', 404)
+    return paginated(request, author.post_set.all())
+
+
+def follow_scopes(request):
+    """Лента меняется с любым постом и с подписками пользователя."""
+    if not request.user.is_authenticated:
+        return None
+    return [index_scope(), profile_scope(request.user.username)]
+
+
+@generation_etag(follow_scopes)
+@api_login_required
+def follow_posts(request):
+    return paginated(request, feed_for(request.user))
@@ -0,0 +1,46 @@
+import asyncio
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+
+
+def merge_cookies(scope):
+    """HTTP/2 присылает cookie отдельными заголовками; WsgiToAsgi
+    склеил бы их через запятую, а Django разбирает «; »."""
+    cookies = [
+        value for name, value in scope.get('headers', ())
+        if name.lower() == b'cookie'
+    ]
+    if len(cookies) < 2:
+        return scope
+    headers = [
+        (name, value) for name, value in scope['headers']
+        if name.lower() != b'cookie'
+    ]
+    headers.append((b'cookie', b'; '.join(cookies)))
+    return dict(scope, headers=headers)
+
+
+class WsgiBridge:
+    """ASGI-приложение поверх WSGI-обработчика.
+
+    Django 2.2 не умеет ASGI: запрос переводит asgiref.wsgi.WsgiToAsgi,
+    а выполняет обычный обработчик в отдельном потоке, как в
+    ASGI-обработчике новых версий Django. Одновременно выполняется
+    не больше workers запросов; остальные ждут в цикле событий,
+    не занимая поток.
+    """
+
+    def __init__(self, application, workers):
+        self.application = WsgiToAsgi(application)
+        self.workers = workers
+        self.semaphore = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.workers)
+        async with self.semaphore:
+            async with ThreadSensitiveContext():
+                await self.application(merge_cookies(scope), receive, send)
@@ -0,0 +1,41 @@
+import time
+
+from django.core.cache import cache
+
+from core import db
+
+LOCK_TIMEOUT = 30
+STALE_TIMEOUT = 60 * 60
+
+
+def single_flight(key, compute, timeout, version=None,
+                  cacheable=lambda value: True):
+    """Возвращает значение из кеша, пересчитывая его одним воркером.
+
+    Запись хранит версию и мягкий срок жизни. Когда запись устарела,
+    пересчет делает только тот, кто первым взял блокировку, остальные
+    до его завершения получают устаревшую копию. Пересчет читает
+    с основной базы.
+    """
+    lock_key = f'{key}:lock'
+    entry = cache.get(key)
+    if entry is not None:
+        entry_version, expires_at, value = entry
+        if entry_version == version and expires_at > time.time():
+            return value
+    locked = cache.add(lock_key, True, LOCK_TIMEOUT)
+    if entry is not None and not locked:
+        return value
+    try:
+        with db.primary():
+            value = compute()
+        if cacheable(value):
+            cache.set(
+                key,
+                (version, time.time() + timeout, value),
+                timeout + STALE_TIMEOUT
+            )
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
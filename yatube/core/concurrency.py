@@ -0,0 +1,76 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core.metrics import current
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.LOOKUP_THREADS,
+                thread_name_prefix='lookups'
+            )
+        return _executor
+
+
+def can_run_concurrently():
+    """Потоки открывают свои соединения: они не видят незакоммиченных
+    данных текущей транзакции и общей in-memory базы SQLite."""
+    if not settings.CONCURRENT_LOOKUPS:
+        return False
+    for alias in connections:
+        db = connections[alias]
+        if db.in_atomic_block or (
+            db.vendor == 'sqlite' and db.is_in_memory_db()
+        ):
+            return False
+    return True
+
+
+def isolated(call):
+    """Выполняет вызов в потоке пула.
+
+    Соединения потока остаются открытыми для следующих обращений, даже
+    при CONN_MAX_AGE = 0: иначе каждое обращение открывало бы новое.
+    Закрывается только соединение, на котором случилась ошибка базы.
+    """
+    collector = current()
+    try:
+        if collector is None:
+            return call()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(collector))
+            return call()
+    finally:
+        for connection in connections.all():
+            if connection.errors_occurred:
+                connection.close()
+
+
+def gather(*calls):
+    """Выполняет независимые обращения к базе и кешу параллельно
+    и возвращает результаты в порядке вызовов.
+
+    Включается настройкой CONCURRENT_LOOKUPS; иначе вызовы идут
+    по очереди в текущем потоке.
+    """
+    if len(calls) < 2 or not can_run_concurrently():
+        return [call() for call in calls]
+    # Потоки получают копию контекста запроса: сборщик метрик
+    # и выбор реплики для чтения.
+    futures = [
+        get_executor().submit(contextvars.copy_context().run, isolated, call)
+        for call in calls
+    ]
+    return [future.result() for future in futures]
@@ -0,0 +1,7 @@
+from notifications.inbox import unread_count
+
+
+def unread_notifications(request):
+    if not request.user.is_authenticated:
+        return {}
+    return {'unread_notifications': unread_count(request.user)}
@@ -0,0 +1,90 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+# Сессии и очередь задач читаются только с основной базы: отставание
+# реплики здесь ломает вход и выдачу задач.
+PRIMARY_APPS = {'sessions', 'tasks'}
+PIN_SESSION_KEY = '_db_primary_until'
+
+_state = ContextVar('db_read_state', default=None)
+_primary_only = ContextVar('db_primary_only', default=False)
+
+
+class ReadState:
+    """Состояние запроса: реплика выбирается один раз на весь запрос,
+    чтобы его чтения видели одно и то же состояние базы."""
+
+    def __init__(self, use_replicas):
+        replicas = settings.DATABASE_REPLICAS
+        self.use_replicas = use_replicas and bool(replicas)
+        self.replica = random.choice(replicas) if self.use_replicas else None
+        self.wrote = False
+
+
+def begin(use_replicas):
+    return _state.set(ReadState(use_replicas))
+
+
+def end(token):
+    """Завершает запрос; возвращает True, если в нем была запись."""
+    state = _state.get()
+    _state.reset(token)
+    return state.wrote
+
+
+@contextmanager
+def primary():
+    """Чтения внутри блока идут на основную базу.
+
+    Нужно для всего, что кладется в кеш под ключом, который сбрасывается
+    записью: значение, прочитанное с отстающей реплики, легло бы под
+    новое поколение и жило бы до следующей записи.
+    """
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+def is_pinned(session):
+    return session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+def pin(session):
+    session[PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+
+
+class ReplicaRouter:
+    """Чтения в безопасных запросах уходят на выбранную для запроса
+    реплику, запись и все остальное — на основную базу.
+
+    После первой записи запрос до конца читает с основной базы.
+    Вне запросов (команды, воркеры) и внутри primary() реплики
+    не используются.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None or not state.use_replicas or _primary_only.get()
+            or model._meta.app_label in PRIMARY_APPS
+        ):
+            return PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.use_replicas = False
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы.
+        return True
@@ -0,0 +1,195 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import wraps
+
+from django.core.cache import caches
+from django.template.backends.django import Template
+
+# Верхние границы корзин гистограммы времени ответа, мс.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SLOW_QUERIES_LOGGED = 5
+
+_current = ContextVar('metrics_collector', default=None)
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL без значений: одинаковые запросы с разными параметрами
+    сводятся к одной строке."""
+    sql = _LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class Collector:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.statements = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            statement = self.statements[fingerprint(sql)]
+            statement[0] += 1
+            statement[1] += elapsed
+
+    def slowest(self):
+        return sorted(
+            self.statements.items(),
+            key=lambda item: item[1][1],
+            reverse=True
+        )[:SLOW_QUERIES_LOGGED]
+
+
+def current():
+    return _current.get()
+
+
+def activate(collector):
+    return _current.set(collector)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.wall_time = 0.0
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.buckets = [0] * len(BUCKETS)
+
+
+class Registry:
+    """Агрегаты по имени вью в памяти процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(ViewStats)
+
+    def record(self, view_name, wall_time, collector):
+        with self._lock:
+            stats = self._views[view_name]
+            stats.requests += 1
+            stats.wall_time += wall_time
+            stats.db_time += collector.db_time
+            stats.queries += collector.queries
+            stats.template_time += collector.template_time
+            stats.cache_hits += collector.cache_hits
+            stats.cache_misses += collector.cache_misses
+            for index, bound in enumerate(BUCKETS):
+                if wall_time * 1000 <= bound:
+                    stats.buckets[index] += 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: dict(vars(stats), buckets=list(stats.buckets))
+                for name, stats in self._views.items()
+            }
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = []
+        views = sorted(self.snapshot().items())
+        for metric, field, kind in (
+            ('yatube_requests_total', 'requests', 'counter'),
+            ('yatube_db_queries_total', 'queries', 'counter'),
+            ('yatube_db_seconds_total', 'db_time', 'counter'),
+            ('yatube_template_seconds_total', 'template_time', 'counter'),
+            ('yatube_cache_hits_total', 'cache_hits', 'counter'),
+            ('yatube_cache_misses_total', 'cache_misses', 'counter'),
+        ):
+            lines.append(f'# TYPE {metric} {kind}')
+            for name, stats in views:
+                lines.append(f'{metric}{{view="{name}"}} {stats[field]}')
+        metric = 'yatube_request_duration_seconds'
+        lines.append(f'# TYPE {metric} histogram')
+        for name, stats in views:
+            for bound, count in zip(BUCKETS, stats['buckets']):
+                lines.append(
+                    f'{metric}_bucket{{view="{name}",le="{bound / 1000}"}}'
+                    f' {count}'
+                )
+            lines.append(
+                f'{metric}_bucket{{view="{name}",le="+Inf"}}'
+                f' {stats["requests"]}'
+            )
+            lines.append(
+                f'{metric}_sum{{view="{name}"}} {stats["wall_time"]}'
+            )
+            lines.append(
+                f'{metric}_count{{view="{name}"}} {stats["requests"]}'
+            )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        collector = current()
+        if collector is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            collector.template_time += time.perf_counter() - started
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, *args, **kwargs):
+        value = get(self, key, default, *args, **kwargs)
+        collector = current()
+        if collector is not None:
+            if value is default:
+                collector.cache_misses += 1
+            else:
+                collector.cache_hits += 1
+        return value
+    wrapper.instrumented = True
+    return wrapper
+
+
+def install():
+    """Оборачивает рендеринг шаблонов и чтение из кеша.
+
+    Вложенные шаблоны рендерятся внутри шаблона бэкенда, поэтому время
+    не считается дважды. Без активного сборщика обертки ничего не делают.
+    """
+    if not getattr(Template.render, 'instrumented', False):
+        Template.render = _timed_render(Template.render)
+    cache_class = type(caches['default'])
+    if not getattr(cache_class.get, 'instrumented', False):
+        cache_class.get = _counted_get(cache_class.get)
@@ -0,0 +1,90 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import db, metrics
+
+logger = logging.getLogger('core.metrics')
+
+
+class MetricsMiddleware:
+    """Собирает время ответа, запросы к базе, рендеринг и обращения
+    к кешу для доли запросов и копит их по имени вью."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.install()
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        collector = metrics.Collector()
+        token = metrics.activate(collector)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(collector)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate(token)
+        wall_time = time.perf_counter() - started
+        view_name = self.view_name(request)
+        metrics.registry.record(view_name, wall_time, collector)
+        if wall_time * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            self.log_slow(request, view_name, wall_time, collector)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else 'unresolved'
+
+    @staticmethod
+    def log_slow(request, view_name, wall_time, collector):
+        statements = '\n'.join(
+            f'  {count} x {elapsed * 1000:.1f} мс: {sql}'
+            for sql, (count, elapsed) in collector.slowest()
+        )
+        logger.warning(
+            'Медленный запрос %s %s (%s): %.0f мс, SQL %d за %.0f мс\n%s',
+            request.method,
+            request.path,
+            view_name,
+            wall_time * 1000,
+            collector.queries,
+            collector.db_time * 1000,
+            statements
+        )
+
+
+class ReplicaMiddleware:
+    """Направляет чтения GET-запросов на реплики.
+
+    После запроса с записью сессия вошедшего пользователя
+    на REPLICA_PIN_SECONDS читает с основной базы, чтобы он видел
+    свои изменения. Должен стоять после SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = db.begin(
+            request.method in ('GET', 'HEAD')
+            and not db.is_pinned(request.session)
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = db.end(token)
+        user = getattr(request, 'user', None)
+        if wrote and user is not None and user.is_authenticated:
+            db.pin(request.session)
+        return response
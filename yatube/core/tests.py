@@ -1,4 +1,33 @@
-from django.test import TestCase
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+from time import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core.asgi import WsgiBridge
+from core.cache import single_flight
+from core import concurrency
+from core.concurrency import can_run_concurrently, gather
+from core import db
+from core.db import ReplicaRouter
+from core.metrics import fingerprint, registry
+from posts.groups import get_group
+from posts.models import Group, Post
+
+User = get_user_model()
+REPLICAS = ['replica_a', 'replica_b']
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +35,404 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SingleFlightTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_fresh_value_is_not_recomputed(self):
+        """Свежее значение берется из кеша без пересчета"""
+        self.assertEqual(single_flight('key', self.compute, 60), 1)
+        self.assertEqual(single_flight('key', self.compute, 60), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_new_version_is_recomputed(self):
+        """Смена версии приводит к пересчету"""
+        single_flight('key', self.compute, 60, version=1)
+        self.assertEqual(single_flight('key', self.compute, 60, version=2), 2)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока другой воркер пересчитывает, отдается устаревшая копия"""
+        single_flight('key', self.compute, 60, version=1)
+        cache.add('key:lock', True)
+        self.assertEqual(single_flight('key', self.compute, 60, version=2), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_expired_value_is_recomputed(self):
+        """Устаревшая по времени запись пересчитывается"""
+        single_flight('key', self.compute, 60)
+        with mock.patch('core.cache.time.time', return_value=time() + 61):
+            self.assertEqual(single_flight('key', self.compute, 60), 2)
+        self.assertIsNone(cache.get('key:lock'))
+
+    def test_uncacheable_value_is_not_stored(self):
+        """Значения, которые нельзя кешировать, не сохраняются"""
+        single_flight('key', self.compute, 60, cacheable=lambda value: False)
+        self.assertIsNone(cache.get('key'))
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0)
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+    def test_fingerprint_drops_values(self):
+        """Отпечаток SQL не зависит от значений параметров"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 1 AND b = 'x'"),
+            fingerprint("SELECT * FROM t WHERE a = 2 AND b = 'y'")
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id IN (...)'
+        )
+
+    def test_request_is_recorded_per_view(self):
+        """Запрос учитывается по имени вью вместе с SQL, шаблонами
+        и кешем"""
+        self.client.get(reverse('posts:index'))
+        stats = registry.snapshot()['posts:index']
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreater(stats['queries'], 0)
+        self.assertGreater(stats['template_time'], 0)
+        self.assertGreater(stats['cache_misses'], 0)
+        self.client.get(reverse('posts:index'))
+        self.assertGreater(
+            registry.snapshot()['posts:index']['cache_hits'], 0
+        )
+
+    @override_settings(METRICS_IPS=['127.0.0.1'])
+    def test_metrics_endpoint(self):
+        """Метрики доступны только с разрешенных адресов"""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertContains(
+            response, 'yatube_requests_total{view="posts:index"} 1'
+        )
+        self.assertContains(
+            response,
+            'yatube_request_duration_seconds_count{view="posts:index"} 1'
+        )
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='192.0.2.1'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_require_token_by_default(self):
+        """Без списка адресов метрики отдаются только по токену"""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong'
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_skipped(self):
+        """Запросы вне выборки не учитываются"""
+        self.client.get(reverse('posts:index'))
+        self.assertNotIn('posts:index', registry.snapshot())
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_is_logged_with_sql(self):
+        """Медленный запрос пишется в лог с отпечатками SQL"""
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+def call_asgi(application, scope, body=b''):
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+class AsgiBridgeTest(SimpleTestCase):
+    def test_request_is_translated_to_wsgi(self):
+        """Мост передает WSGI-обработчику путь, заголовки и тело"""
+        environs = []
+
+        def application(environ, start_response):
+            environs.append(dict(environ, body=environ['wsgi.input'].read()))
+            start_response('201 Created', [('X-Test', 'yes')])
+            return [b'o', b'k']
+
+        sent = call_asgi(WsgiBridge(application, 1), {
+            'type': 'http',
+            'method': 'POST',
+            'path': '/путь/',
+            'query_string': b'a=1',
+            'http_version': '1.1',
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'cookie', b'a=1'),
+                (b'cookie', b'b=2'),
+            ],
+        }, b'body')
+        environ = environs[0]
+        self.assertEqual(environ['PATH_INFO'].encode('latin1').decode(),
+                         '/путь/')
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['body'], b'body')
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn((b'x-test', b'yes'), sent[0]['headers'])
+        self.assertEqual(
+            b''.join(message.get('body', b'') for message in sent[1:]), b'ok'
+        )
+
+    def test_django_page_through_bridge(self):
+        """Страница Django отдается через ASGI"""
+        sent = call_asgi(WsgiBridge(WSGIHandler(), 1), {
+            'type': 'http',
+            'method': 'GET',
+            'path': reverse('about:author'),
+            'query_string': b'',
+            'http_version': '1.1',
+            'headers': [(b'host', b'testserver')],
+            'client': ('192.0.2.1', 0),
+        })
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn('Об авторе'.encode(), b''.join(
+            message.get('body', b'') for message in sent[1:]
+        ))
+
+
+class GatherTest(SimpleTestCase):
+    def test_sequential_by_default(self):
+        """Без настройки вызовы идут по очереди в текущем потоке"""
+        thread = threading.current_thread()
+        self.assertEqual(
+            gather(lambda: threading.current_thread(), lambda: 2),
+            [thread, 2]
+        )
+        with override_settings(CONCURRENT_LOOKUPS=True):
+            # Тестовая база SQLite — в памяти.
+            self.assertFalse(can_run_concurrently())
+
+    def test_concurrent_lookups_keep_order(self):
+        """Включенные параллельные обращения идут в пуле потоков,
+        результаты — в порядке вызовов"""
+        with mock.patch(
+            'core.concurrency.can_run_concurrently', return_value=True
+        ):
+            names = gather(*(
+                lambda number=number: (
+                    number, threading.current_thread().name
+                )
+                for number in range(3)
+            ))
+        self.assertEqual([number for number, _ in names], [0, 1, 2])
+        for _, name in names:
+            self.assertTrue(name.startswith('lookups'))
+
+
+@override_settings(CONCURRENT_LOOKUPS=True, LOOKUP_THREADS=1)
+class ConcurrentLookupsTest(TransactionTestCase):
+    """Потокам пула нужна общая база, поэтому основная база на время
+    тестов подменяется файлом SQLite."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.memory = connections['default']
+        cls.memory_settings = connections.databases['default']
+        connections.databases['default'] = dict(
+            cls.memory_settings,
+            NAME=os.path.join(cls.directory, 'default.sqlite3')
+        )
+        del connections['default']
+        call_command('migrate', verbosity=0)
+        concurrency._executor = None
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        concurrency.get_executor().shutdown()
+        concurrency._executor = None
+        connections['default'].close()
+        connections.databases['default'] = cls.memory_settings
+        connections['default'] = cls.memory
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            text='Тестовый пост', author=self.author
+        )
+        self.reader = User.objects.create_user(username='reader')
+        self.client.force_login(self.reader)
+
+    def test_pages_render_with_concurrent_lookups(self):
+        """Профиль и пост отдаются с обращениями к базе из пула,
+        а потоки пула не открывают соединение на каждое обращение"""
+        self.assertTrue(can_run_concurrently())
+        urls = [
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Тестовый пост')
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count)
+        try:
+            for url in urls:
+                self.client.get(url, HTTP_CACHE_CONTROL='no-cache')
+        finally:
+            connection_created.disconnect(count)
+        self.assertEqual(opened, [])
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRoutingTest(TestCase):
+    """Реплики — отдельные файлы SQLite без репликации: по содержимому
+    страницы видно, из какой базы она прочитана."""
+    databases = {'default', *REPLICAS}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        for alias in REPLICAS:
+            connections.databases[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(cls.directory, f'{alias}.sqlite3'),
+            }
+        call_command('migrate', database=REPLICAS[0], verbosity=0)
+        connections[REPLICAS[0]].close()
+        for alias in REPLICAS[1:]:
+            shutil.copy(
+                connections.databases[REPLICAS[0]]['NAME'],
+                connections.databases[alias]['NAME']
+            )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        for alias in REPLICAS:
+            User.objects.using(alias).bulk_create([
+                User.objects.get(pk=self.author.pk)
+            ])
+            Post.objects.using(alias).bulk_create([
+                Post(text='Пост с реплики', author_id=self.author.pk)
+            ])
+
+    def test_get_reads_from_replica(self):
+        """GET-запрос страницы без ETag читает с реплики"""
+        Post.objects.create(text='Пост с основной базы', author=self.author)
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост с реплики')
+        self.assertNotContains(response, 'Пост с основной базы')
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_pages_with_etag_read_from_primary(self):
+        """Страницы и API с ETag читаются с основной базы, поэтому
+        условные запросы работают и с репликами"""
+        post = Post.objects.create(
+            text='Пост с основной базы', author=self.author
+        )
+        urls = (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+            reverse('api:post_detail', args=[post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Пост с основной базы')
+                etag = response['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_cache_fills_read_from_primary(self):
+        """Страница для кеша и значения под сбрасываемыми ключами
+        читаются с основной базы"""
+        group = Group.objects.create(title='Группа', slug='primary')
+        Post.objects.create(
+            text='Пост с основной базы', author=self.author, group=group
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост с основной базы')
+        response = self.client.get(
+            reverse('posts:group_list', args=[group.slug])
+        )
+        self.assertContains(response, 'Пост с основной базы')
+        self.assertTrue(response.has_header('ETag'))
+        token = db.begin(True)
+        try:
+            self.assertEqual(get_group('primary'), group)
+        finally:
+            db.end(token)
+
+    def test_replica_is_chosen_once_per_request(self):
+        """Все чтения запроса идут на одну реплику"""
+        router = ReplicaRouter()
+        for _ in range(5):
+            token = db.begin(True)
+            try:
+                aliases = {router.db_for_read(Post) for _ in range(10)}
+                with db.primary():
+                    self.assertEqual(router.db_for_read(Post), 'default')
+            finally:
+                db.end(token)
+            self.assertEqual(len(aliases), 1)
+            self.assertIn(aliases.pop(), REPLICAS)
+
+    def test_write_pins_session_to_primary(self):
+        """После записи пользователь читает свои изменения с основной
+        базы, пока не истечет окно"""
+        self.client.force_login(self.author)
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Свой новый пост'}
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свой новый пост')
+        with mock.patch('core.db.time.time', return_value=time() + 3600):
+            response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Свой новый пост')
+        self.assertContains(response, 'Пост с реплики')
+
+    def test_outside_requests_primary_is_used(self):
+        """Вне запросов и для записи используется основная база"""
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from .metrics import registry
 
 
 def page_not_found(request, exception):
@@ -15,3 +20,24 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def has_metrics_token(request):
+    scheme, _, token = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    return bool(settings.METRICS_TOKEN) and scheme == 'Bearer' and (
+        constant_time_compare(token, settings.METRICS_TOKEN)
+    )
+
+
+def metrics(request):
+    """Метрики процесса для сборщика с токеном или разрешенного адреса
+    и для сотрудников."""
+    if not (request.user.is_staff
+            or has_metrics_token(request)
+            or request.META.get('REMOTE_ADDR') in settings.METRICS_IPS):
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,7 @@
+NOTIFICATION_BATCH_SIZE = 1000
+NOTIFICATIONS_KEEP_DAYS = 90
+NOTIFICATIONS_READ_KEEP_DAYS = 14
+UNREAD_COUNT_CACHE = 60 * 60 * 24
+DIGEST_CHUNK_SIZE = 500
+DIGEST_MAX_POSTS = 20
+DIGEST_PERIODS = {'daily': 1, 'weekly': 7}
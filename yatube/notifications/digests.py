@@ -0,0 +1,150 @@
+import heapq
+import time
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Max, OuterRef, Subquery
+from django.template.loader import get_template
+from django.utils import timezone
+
+from notifications import constants
+from posts.models import Follow, Post, User
+
+SUBJECTS = {
+    'daily': 'Yatube: новые посты за день',
+    'weekly': 'Yatube: новые посты за неделю',
+}
+
+
+class PostsByAuthor:
+    """Свежие посты авторов, загружаемые пачками и переиспользуемые
+    между порциями пользователей.
+
+    Пользователи идут по возрастанию id, поэтому посты автора
+    забываются после порции с его последним подписчиком.
+    """
+
+    def __init__(self, since):
+        self.since = since
+        self.posts = {}
+        self.last_reader = dict(Follow.objects.filter(
+            author__in=Post.objects.filter(
+                pub_date__gte=since
+            ).values('author')
+        ).order_by().values('author').annotate(
+            last=Max('user')
+        ).values_list('author', 'last'))
+
+    def load(self, author_ids):
+        """Читает не больше DIGEST_MAX_POSTS постов каждого автора."""
+        missing = {
+            author_id for author_id in author_ids
+            if author_id in self.last_reader
+        } - self.posts.keys()
+        if not missing:
+            return
+        for author_id in missing:
+            self.posts[author_id] = []
+        newest = Post.objects.filter(
+            author_id=OuterRef('author_id'), pub_date__gte=self.since
+        ).order_by('-pub_date', '-pk').values('pk')
+        for post in Post.objects.filter(
+            author_id__in=missing,
+            pk__in=Subquery(newest[:constants.DIGEST_MAX_POSTS])
+        ).select_related('author', 'group').only(
+            'text', 'pub_date', 'author', 'group', 'author__username',
+            'author__first_name', 'author__last_name', 'group__title'
+        ).order_by('-pub_date', '-pk').iterator():
+            self.posts[post.author_id].append(post)
+
+    def evict(self, last_user_id):
+        """Забывает авторов, все подписчики которых уже обработаны."""
+        for author_id in [
+            author_id for author_id in self.posts
+            if self.last_reader[author_id] <= last_user_id
+        ]:
+            del self.posts[author_id]
+
+    def latest(self, author_ids):
+        return list(islice(
+            heapq.merge(
+                *(self.posts.get(author_id, ()) for author_id in author_ids),
+                key=attrgetter('pub_date'),
+                reverse=True
+            ),
+            constants.DIGEST_MAX_POSTS
+        ))
+
+
+def recipients(chunk_size):
+    users = User.objects.filter(is_active=True).exclude(email='').order_by(
+        'pk'
+    ).only('username', 'email', 'first_name', 'last_name').iterator(
+        chunk_size=chunk_size
+    )
+    while True:
+        chunk = list(islice(users, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def followed_authors(users):
+    authors = defaultdict(list)
+    for user_id, author_id in Follow.objects.filter(
+        user_id__in=[user.pk for user in users]
+    ).values_list('user_id', 'author_id'):
+        authors[user_id].append(author_id)
+    return authors
+
+
+def send_digests(period='daily', chunk_size=constants.DIGEST_CHUNK_SIZE):
+    """Отправляет дайджесты всем пользователям с почтой.
+
+    Подписки и посты читаются пачками на порцию пользователей, шаблон
+    загружается один раз, письма уходят через одно соединение.
+    """
+    started = time.perf_counter()
+    since = timezone.now() - timedelta(days=constants.DIGEST_PERIODS[period])
+    template = get_template('notifications/digest.txt')
+    posts = PostsByAuthor(since)
+    users_total = sent = 0
+    connection = get_connection()
+    connection.open()
+    try:
+        for users in recipients(chunk_size):
+            authors = followed_authors(users)
+            posts.load(
+                author_id for ids in authors.values() for author_id in ids
+            )
+            messages = []
+            for user in users:
+                latest = posts.latest(authors.get(user.pk, ()))
+                if not latest:
+                    continue
+                messages.append(EmailMessage(
+                    SUBJECTS[period],
+                    template.render({
+                        'user': user,
+                        'posts': latest,
+                        'site_url': settings.SITE_URL,
+                    }),
+                    to=[user.email],
+                    connection=connection
+                ))
+            sent += connection.send_messages(messages) or 0
+            users_total += len(users)
+            posts.evict(users[-1].pk)
+    finally:
+        connection.close()
+    elapsed = time.perf_counter() - started
+    return {
+        'users': users_total,
+        'sent': sent,
+        'seconds': elapsed,
+        'users_per_second': users_total / elapsed if elapsed else 0.0,
+    }
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.db import primary
+from notifications import constants
+from posts.models import Follow
+
+from .models import Notification
+
+
+def unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count(user):
+    """Число непрочитанных из кеша; при промахе — один COUNT по индексу."""
+    key = unread_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        with primary():
+            count = Notification.objects.filter(
+                recipient=user, is_read=False
+            ).count()
+        cache.set(key, count, constants.UNREAD_COUNT_CACHE)
+    return count
+
+
+def reset_unread(*user_ids):
+    """Сбрасывает счетчики сразу и еще раз после коммита: до коммита
+    их могли пересчитать по старым данным."""
+    keys = [unread_key(user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def bulk_notify(notifications):
+    """Пишет уведомления пачками, по одному INSERT на пачку.
+
+    Повторная доставка того же события пропускается уникальными
+    ограничениями, поэтому задачу можно безопасно повторять.
+    """
+    notifications = iter(notifications)
+    total = 0
+    while True:
+        batch = list(islice(notifications, constants.NOTIFICATION_BATCH_SIZE))
+        if not batch:
+            break
+        Notification.objects.bulk_create(batch, ignore_conflicts=True)
+        reset_unread(*(notification.recipient_id for notification in batch))
+        total += len(batch)
+    return total
+
+
+def deliver_post(post):
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    return bulk_notify(
+        Notification(
+            recipient_id=user_id,
+            actor_id=post.author_id,
+            kind=Notification.NEW_POST,
+            post_id=post.pk,
+        )
+        for user_id in follower_ids.iterator()
+    )
+
+
+def deliver_comment(comment):
+    if comment.author_id == comment.post.author_id:
+        return 0
+    return bulk_notify([Notification(
+        recipient_id=comment.post.author_id,
+        actor_id=comment.author_id,
+        kind=Notification.NEW_COMMENT,
+        post_id=comment.post_id,
+        comment_id=comment.pk,
+    )])
+
+
+def inbox_for(user):
+    return Notification.objects.filter(recipient=user).select_related(
+        'actor', 'post'
+    )
+
+
+def mark_read(user):
+    updated = Notification.objects.filter(
+        recipient=user, is_read=False
+    ).update(is_read=True)
+    if updated:
+        reset_unread(user.pk)
+    return updated
+
+
+def compact():
+    """Удаляет старые уведомления пачками; прочитанные хранятся
+    меньше непрочитанных."""
+    now = timezone.now()
+    old = Notification.objects.filter(
+        Q(created__lt=now - timedelta(days=constants.NOTIFICATIONS_KEEP_DAYS))
+        | Q(
+            is_read=True,
+            created__lt=now - timedelta(
+                days=constants.NOTIFICATIONS_READ_KEEP_DAYS
+            )
+        )
+    ).order_by('pk')
+    total = 0
+    while True:
+        ids = list(
+            old.values_list('pk', flat=True)[
+                :constants.NOTIFICATION_BATCH_SIZE
+            ]
+        )
+        if not ids:
+            break
+        recipients = Notification.objects.filter(
+            pk__in=ids, is_read=False
+        ).values_list('recipient_id', flat=True)
+        reset_unread(*recipients)
+        total += Notification.objects.filter(pk__in=ids).delete()[0]
+    return total
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from notifications.inbox import compact
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые уведомления'
+
+    def handle(self, *args, **options):
+        total = compact()
+        self.stdout.write(
+            self.style.SUCCESS(f'Удалено уведомлений: {total}')
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from notifications import constants
+from notifications.digests import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Рассылает дайджесты новых постов от авторов из подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period',
+            choices=sorted(constants.DIGEST_PERIODS),
+            default='daily',
+            help='За какой период собирать посты'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=constants.DIGEST_CHUNK_SIZE,
+            help='Сколько пользователей обрабатывать за раз'
+        )
+
+    def handle(self, *args, **options):
+        report = send_digests(options['period'], options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {report["users"]}, '
+            f'писем: {report["sent"]}, '
+            f'{report["users_per_second"]:.1f} пользователей/с'
+        ))
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class Notification(models.Model):
+    NEW_POST = 'post'
+    NEW_COMMENT = 'comment'
+    KINDS = (
+        (NEW_POST, 'Новый пост'),
+        (NEW_COMMENT, 'Новый комментарий'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель'
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор события'
+    )
+    kind = models.CharField('Тип', max_length=10, choices=KINDS)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        related_name='+',
+        blank=True,
+        null=True
+    )
+    created = models.DateTimeField('Дата', auto_now_add=True, db_index=True)
+    is_read = models.BooleanField('Прочитано', default=False)
+
+    class Meta:
+        ordering = ['-created', '-pk']
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipient', 'post'],
+                condition=models.Q(kind='post'),
+                name='unique_post_notification'
+            ),
+            models.UniqueConstraint(
+                fields=['recipient', 'comment'],
+                condition=models.Q(kind='comment'),
+                name='unique_comment_notification'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipient', 'is_read', '-created'],
+                name='notification_inbox_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} для {self.recipient}'
@@ -0,0 +1,20 @@
+from posts.models import Comment, Post
+from tasks.queue import task
+
+from . import inbox
+
+
+@task('notifications.deliver_post')
+def deliver_post(post_id):
+    post = Post.objects.filter(pk=post_id).only('pk', 'author_id').first()
+    if post is not None:
+        inbox.deliver_post(post)
+
+
+@task('notifications.deliver_comment')
+def deliver_comment(comment_id):
+    comment = Comment.objects.filter(pk=comment_id).select_related(
+        'post'
+    ).only('pk', 'author_id', 'post__author_id').first()
+    if comment is not None:
+        inbox.deliver_comment(comment)
@@ -0,0 +1,179 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications import constants
+from notifications.digests import PostsByAuthor, send_digests
+from notifications.inbox import deliver_post, unread_count
+from notifications.models import Notification
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class NotificationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(3)
+        ]
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader = self.readers[0]
+        self.client.force_login(self.reader)
+
+    def test_post_is_delivered_in_one_batch(self):
+        """Пост доставляется подписчикам одним INSERT и без дублей"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertEqual(
+            Notification.objects.filter(post=post).count(), len(self.readers)
+        )
+        with self.assertNumQueries(2):
+            deliver_post(post)
+        self.assertEqual(
+            Notification.objects.filter(post=post).count(), len(self.readers)
+        )
+
+    def test_comment_notifies_post_author(self):
+        """Комментарий уведомляет автора поста, но не о своих"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        Comment.objects.create(post=post, author=self.author, text='Свой')
+        self.assertEqual(
+            self.author.notifications.get().kind, Notification.NEW_COMMENT
+        )
+
+    def test_unread_count_is_cached(self):
+        """Счетчик непрочитанных читается из кеша и сбрасывается
+        при доставке"""
+        self.assertEqual(unread_count(self.reader), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.reader), 0)
+        Post.objects.create(text='Пост', author=self.author)
+        self.assertEqual(unread_count(self.reader), 1)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['unread_notifications'], 1)
+        self.assertContains(response, 'badge')
+
+    def test_inbox_does_not_mark_read_on_get(self):
+        """Просмотр уведомлений ничего не отмечает прочитанным"""
+        Post.objects.create(text='Пост', author=self.author)
+        response = self.client.get(reverse('notifications:inbox'))
+        self.assertContains(response, 'list-group-item-info')
+        self.assertContains(response, reverse('notifications:read_all'))
+        self.assertEqual(unread_count(self.reader), 1)
+
+    def test_read_all(self):
+        """Все уведомления можно отметить прочитанными"""
+        Post.objects.create(text='Пост', author=self.author)
+        response = self.client.post(reverse('notifications:read_all'))
+        self.assertRedirects(response, reverse('notifications:inbox'))
+        self.assertEqual(unread_count(self.reader), 0)
+        self.assertFalse(
+            self.reader.notifications.filter(is_read=False).exists()
+        )
+        response = self.client.get(reverse('notifications:inbox'))
+        self.assertNotContains(response, 'list-group-item-info')
+
+    def test_profile_etag_follows_unread_count(self):
+        """Новое уведомление меняет ETag страницы с бейджем"""
+        url = reverse('posts:profile', args=[self.readers[1].username])
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(text='Пост', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_compact(self):
+        """Старые уведомления удаляются, прочитанные раньше"""
+        Post.objects.create(text='Пост', author=self.author)
+        self.reader.notifications.update(is_read=True)
+        self.assertEqual(unread_count(self.readers[1]), 1)
+        later = timezone.now() + timedelta(
+            days=constants.NOTIFICATIONS_READ_KEEP_DAYS + 1
+        )
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            call_command('compact_notifications', stdout=StringIO())
+        self.assertFalse(self.reader.notifications.exists())
+        self.assertTrue(self.readers[1].notifications.exists())
+        later += timedelta(days=constants.NOTIFICATIONS_KEEP_DAYS)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            call_command('compact_notifications', stdout=StringIO())
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(unread_count(self.readers[1]), 0)
+
+
+class DigestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.create(text='Свежий пост', author=cls.author)
+        old = Post.objects.create(text='Пост недельной давности',
+                                  author=cls.author)
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=3)
+        )
+
+    def test_daily_digest(self):
+        """Дневной дайджест содержит только посты за сутки"""
+        call_command('send_digests', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['reader@example.com'])
+        self.assertIn('Свежий пост', message.body)
+        self.assertIn('Лев Толстой', message.body)
+        self.assertNotIn('недельной', message.body)
+
+    def test_weekly_digest(self):
+        """Недельный дайджест включает посты за неделю"""
+        send_digests('weekly')
+        self.assertIn('недельной', mail.outbox[0].body)
+
+    def test_queries_do_not_grow_with_users(self):
+        """Число запросов зависит от числа порций, а не пользователей"""
+        for number in range(5):
+            user = User.objects.create_user(
+                username=f'user{number}', email=f'user{number}@example.com'
+            )
+            Follow.objects.create(user=user, author=self.author)
+        with self.assertNumQueries(4):
+            report = send_digests(chunk_size=100)
+        self.assertEqual(report['sent'], 6)
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertGreater(report['users_per_second'], 0)
+
+    @mock.patch('notifications.constants.DIGEST_MAX_POSTS', 1)
+    def test_posts_are_limited_and_evicted(self):
+        """Посты автора читаются с лимитом и забываются после
+        его последнего подписчика"""
+        posts = PostsByAuthor(timezone.now() - timedelta(days=7))
+        with self.assertNumQueries(1):
+            posts.load([self.author.pk, self.reader.pk])
+        self.assertEqual(
+            [post.text for post in posts.latest([self.author.pk])],
+            ['Свежий пост']
+        )
+        posts.evict(self.reader.pk - 1)
+        self.assertIn(self.author.pk, posts.posts)
+        posts.evict(self.reader.pk)
+        self.assertNotIn(self.author.pk, posts.posts)
@@ -0,0 +1,22 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_POST
+
+from posts.utils import paginate
+
+from .inbox import inbox_for, mark_read
+
+
+@login_required
+def inbox(request):
+    # Просмотр ничего не пишет: уведомления отмечаются прочитанными
+    # формой read_all, поэтому GET может обслужить реплика.
+    page = paginate(request, inbox_for(request.user), field='created')
+    return render(request, 'notifications/inbox.html', {'page_obj': page})
+
+
+@login_required
+@require_POST
+def read_all(request):
+    mark_read(request.user)
+    return redirect('notifications:inbox')
@@ -0,0 +1,324 @@
+import asyncio
+import math
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+
+from core.asgi import WsgiBridge
+from posts import constants
+
+from .models import Comment, Follow, Group, Post, User
+from .transfer import Importer, rebuild_derived
+
+PERCENTILES = (50, 90, 95, 99)
+# Адрес вне INTERNAL_IPS: debug toolbar не должен искажать замеры.
+CLIENT_ADDRESS = '192.0.2.1'
+
+
+def seed(users, groups, posts, comments, follows, random_seed=None):
+    """Заполняет базу случайными данными пачками через bulk_create."""
+    fake = Faker('ru_RU')
+    rng = random.Random(random_seed)
+    if random_seed is not None:
+        fake.seed_instance(random_seed)
+    prefix = f'seed{rng.randrange(10 ** 6)}'
+    bulk_users(prefix, users, fake)
+    usernames = [f'{prefix}_{number}' for number in range(users)]
+    # Каждый запуск — отдельный источник, поэтому id постов в нем
+    # начинаются с единицы.
+    importer = Importer(source=prefix)
+    importer.run('groups', (
+        {
+            'title': f'{fake.word().capitalize()} {prefix}-{number}',
+            'slug': f'{prefix}-{number}',
+            'description': fake.sentence(),
+        }
+        for number in range(groups)
+    ))
+    slugs = [f'{prefix}-{number}' for number in range(groups)]
+    importer.run('posts', (
+        {
+            'id': number + 1,
+            'text': fake.paragraph(),
+            'pub_date': fake.date_time_this_decade(
+                tzinfo=timezone.utc
+            ).isoformat(),
+            'author': rng.choice(usernames),
+            'group': rng.choice(slugs) if slugs and rng.random() < 0.7
+            else None,
+        }
+        for number in range(posts)
+    ))
+    if comments and posts:
+        importer.run('comments', (
+            {
+                'post': rng.randrange(posts) + 1,
+                'author': rng.choice(usernames),
+                'text': fake.sentence(),
+            }
+            for _ in range(comments)
+        ))
+    if users > 1:
+        importer.run('follows', (
+            {
+                'user': rng.choice(usernames),
+                'author': rng.choice(usernames),
+            }
+            for _ in range(follows)
+        ))
+    rebuild_derived(importer.scopes)
+    return prefix
+
+
+def bulk_users(prefix, total, fake):
+    users = (
+        User(
+            username=f'{prefix}_{number}',
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            password=make_password(None),
+        )
+        for number in range(total)
+    )
+    while True:
+        batch = list(islice(users, constants.TRANSFER_BATCH_SIZE))
+        if not batch:
+            break
+        User.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def measure(client, method, url, iterations, data=None, cold=False):
+    timings, queries = [], []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data or {})
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{url} ответил {response.status_code}')
+        queries.append(len(context.captured_queries))
+    result = {
+        f'p{percent}': round(percentile(timings, percent), 3)
+        for percent in PERCENTILES
+    }
+    result['mean'] = round(statistics.mean(timings), 3)
+    result['queries'] = max(queries)
+    return result
+
+
+def scenarios():
+    """Страницы для замеров на самых нагруженных объектах базы."""
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    author = User.objects.filter(
+        stats__isnull=False
+    ).order_by('-stats__post_count').first()
+    reader = User.objects.filter(
+        stats__isnull=False
+    ).order_by('-stats__following_count').first()
+    post = Post.objects.order_by('-comment_count').first()
+    if None in (group, author, reader, post):
+        raise RuntimeError(
+            'Недостаточно данных: сначала выполните seed_data'
+        )
+    # Чтение меряется анонимно, как у большинства посетителей,
+    # лента подписок и запись — от имени читателя.
+    return reader, [
+        ('index', False, 'get', reverse('posts:index'), None),
+        ('popular', False, 'get', reverse('posts:popular'), None),
+        ('group_posts', False, 'get',
+         reverse('posts:group_list', args=[group.slug]), None),
+        ('profile', False, 'get',
+         reverse('posts:profile', args=[author.username]), None),
+        ('post_detail', False, 'get',
+         reverse('posts:post_detail', args=[post.pk]), None),
+        ('follow_index', True, 'get', reverse('posts:follow_index'), None),
+        ('post_create', True, 'post', reverse('posts:post_create'),
+         {'text': 'Пост из бенчмарка'}),
+        ('add_comment', True, 'post',
+         reverse('posts:add_comment', args=[post.pk]),
+         {'text': 'Комментарий из бенчмарка'}),
+    ]
+
+
+def run(iterations, cold=False, only=None):
+    """Замеряет страницы; записи бенчмарка откатываются."""
+    results = {}
+    with transaction.atomic():
+        reader, pages = scenarios()
+        guest_client = Client(REMOTE_ADDR=CLIENT_ADDRESS)
+        reader_client = Client(REMOTE_ADDR=CLIENT_ADDRESS)
+        reader_client.force_login(reader)
+        for name, authorized, method, url, data in pages:
+            if only and name not in only:
+                continue
+            client = reader_client if authorized else guest_client
+            results[name] = measure(
+                client, method, url, iterations, data, cold
+            )
+        transaction.set_rollback(True)
+    return {
+        'iterations': iterations,
+        'cold_cache': cold,
+        'dataset': {
+            model._meta.model_name: model.objects.count()
+            for model in (User, Group, Post, Comment, Follow)
+        },
+        'results': results,
+    }
+
+
+def regressions(report, baseline, threshold):
+    """Сценарии, где p95 вырос больше порога или стало больше запросов."""
+    found = []
+    for name, result in report['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            continue
+        if result['p95'] > before['p95'] * (1 + threshold):
+            found.append(
+                f'{name}: p95 {before["p95"]} -> {result["p95"]} мс'
+            )
+        if result['queries'] > before['queries']:
+            found.append(
+                f'{name}: запросов {before["queries"]} -> '
+                f'{result["queries"]}'
+            )
+    return found
+
+
+def request_scope(url):
+    path, _, query = url.partition('?')
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'http_version': '1.1',
+        'headers': [(b'host', b'testserver')],
+        'client': (CLIENT_ADDRESS, 0),
+        'server': ('testserver', 80),
+    }
+
+
+def request_environ(url):
+    path, _, query = url.partition('?')
+    environ = {
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'HTTP_HOST': 'testserver',
+        'REMOTE_ADDR': CLIENT_ADDRESS,
+    }
+    setup_testing_defaults(environ)
+    return environ
+
+
+def wsgi_call(handler, url):
+    started = time.perf_counter()
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+
+    result = handler(request_environ(url), start_response)
+    try:
+        b''.join(result)
+    finally:
+        result.close()
+    return response['status'], (time.perf_counter() - started) * 1000
+
+
+async def asgi_call(application, url, semaphore):
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    response = {}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+
+    async with semaphore:
+        started = time.perf_counter()
+        await application(request_scope(url), receive, send)
+        return response['status'], (time.perf_counter() - started) * 1000
+
+
+async def asgi_requests(application, urls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(
+        asgi_call(application, url, semaphore) for url in urls
+    ))
+
+
+def summarize(results, elapsed):
+    timings = [timing for _, timing in results]
+    return {
+        'requests': len(results),
+        'errors': sum(status >= 400 for status, _ in results),
+        'seconds': round(elapsed, 3),
+        'rps': round(len(results) / elapsed, 1),
+        'p50': round(percentile(timings, 50), 3),
+        'p95': round(percentile(timings, 95), 3),
+    }
+
+
+def throughput(requests, concurrency):
+    """Пропускная способность WSGI-обработчика и ASGI-моста при
+    одновременных анонимных запросах к страницам чтения.
+
+    Запросы идут мимо сети, напрямую в приложения, поэтому меряется
+    только обработка в Django. База должна быть файловой: потоки
+    открывают свои соединения.
+    """
+    _, pages = scenarios()
+    urls = [
+        url for _, authorized, method, url, _ in pages
+        if method == 'get' and not authorized
+    ]
+    handler = WSGIHandler()
+    for url in urls:
+        wsgi_call(handler, url)
+    urls = [urls[number % len(urls)] for number in range(requests)]
+    results = {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        responses = list(executor.map(partial(wsgi_call, handler), urls))
+    results['wsgi'] = summarize(responses, time.perf_counter() - started)
+    bridge = WsgiBridge(handler, settings.ASGI_THREADS)
+    started = time.perf_counter()
+    responses = asyncio.run(asgi_requests(bridge, urls, concurrency))
+    results['asgi'] = summarize(responses, time.perf_counter() - started)
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'asgi_threads': settings.ASGI_THREADS,
+        'concurrent_lookups': settings.CONCURRENT_LOOKUPS,
+        'results': results,
+    }
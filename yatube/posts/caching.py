@@ -0,0 +1,190 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.module_loading import import_string
+from django.views.decorators.http import condition
+
+from core import db
+from core.cache import single_flight
+from posts import constants
+
+from .models import Post
+
+
+def hashed(value):
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def generation_key(scope):
+    return f'posts:generation:{hashed(scope)}'
+
+
+def get_generation(scope):
+    return cache.get_or_set(generation_key(scope), time.time_ns, None)
+
+
+def bump_generations(*scopes):
+    """Сдвигает поколения: страницы прошлых поколений больше не читаются.
+
+    Если ключа поколения в кеше нет, берется текущее время, чтобы
+    не совпасть с поколением страниц, которые еще лежат в кеше.
+    """
+    for scope in set(scopes):
+        try:
+            cache.incr(generation_key(scope))
+        except ValueError:
+            cache.set(generation_key(scope), time.time_ns(), None)
+
+
+def index_scope():
+    return 'index'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def groups_scope():
+    """Список групп: меняется вместе с группами и их счетчиками."""
+    return 'groups'
+
+
+def group_registry_scope():
+    return 'group-registry'
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def suggestions_scope():
+    """Рекомендации подписок: меняются при пакетном пересчете."""
+    return 'suggestions'
+
+
+def profile_page_scopes(username):
+    """Страница профиля показывает владельцу его рекомендации."""
+    return [profile_scope(username), suggestions_scope()]
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def post_scopes(post):
+    scopes = [
+        index_scope(),
+        profile_scope(post.author.username),
+        post_scope(post.pk),
+    ]
+    if post.group_id:
+        scopes.append(group_scope(post.group.slug))
+        scopes.append(groups_scope())
+    return scopes
+
+
+def post_page_scopes(post_id):
+    """Области страницы поста: сам пост, автор и группа."""
+    scopes = [post_scope(post_id)]
+    names = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug'
+    ).first()
+    if names is not None:
+        username, slug = names
+        scopes.append(profile_scope(username))
+        if slug:
+            scopes.append(group_scope(slug))
+    return scopes
+
+
+def page_cache_key(scope, request):
+    return f'posts:page:{hashed(scope)}:{hashed(request.get_full_path())}'
+
+
+def cache_page_by_generation(scope_func):
+    """Кеширует страницу для анонимных пользователей.
+
+    Запись помечена поколением области страницы: после изменения
+    постов этой области страницу пересчитывает один воркер, а
+    остальные до конца пересчета отдают прошлую копию.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            scope = scope_func(**kwargs)
+            return single_flight(
+                page_cache_key(scope, request),
+                lambda: view(request, *args, **kwargs),
+                constants.PAGE_CACHE,
+                version=get_generation(scope),
+                cacheable=lambda response: response.status_code == 200
+            )
+        return wrapper
+    return decorator
+
+
+def user_etag_parts(user):
+    """Значения функций из PAGE_ETAG_USER_PARTS для пользователя."""
+    return ':'.join(
+        str(import_string(path)(user))
+        for path in getattr(settings, 'PAGE_ETAG_USER_PARTS', ())
+    )
+
+
+def page_etag(scope_func):
+    """ETag страницы из поколений ее областей.
+
+    В ETag входят пользователь, значения из PAGE_ETAG_USER_PARTS
+    и CSRF-cookie: страница для вошедшего пользователя содержит его имя,
+    счетчики в шапке и токен формы.
+    """
+    def etag(request, *args, **kwargs):
+        scopes = scope_func(**kwargs)
+        if isinstance(scopes, str):
+            scopes = [scopes]
+        versions = ':'.join(
+            f'{scope}={get_generation(scope)}' for scope in scopes
+        )
+        user = ''
+        if request.user.is_authenticated:
+            user = f'{request.user.pk}:{user_etag_parts(request.user)}'
+        csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+        return hashed(
+            f'{versions}:{request.get_full_path()}:{user}:{csrf}'
+        )
+    return etag
+
+
+def conditional_page(scope_func):
+    """Отвечает 304 без рендеринга, если ETag страницы не изменился.
+
+    Анонимные ответы разрешено хранить общим кешам на PAGE_MAX_AGE,
+    ответы вошедшим пользователям — только браузеру с ревалидацией.
+    Страница с ETag читается с основной базы: реплика могла еще
+    не получить запись, сдвинувшую поколение, и ответ со старыми
+    данными получил бы новый ETag. Ответ 304 базу не читает, а страницы
+    из кеша и так собираются на основной базе.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=page_etag(scope_func))(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with db.primary():
+                response = conditional_view(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(
+                    response, public=True, max_age=constants.PAGE_MAX_AGE
+                )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -1,3 +1,40 @@
 TEXT_PREVIEW = 15
 POST_PER_PAGE = 10
-INDEX_CACHE = 20
+COMMENTS_PER_PAGE = 20
+PAGE_CACHE = 60 * 60
+PAGE_MAX_AGE = 60
+POST_CARD_CACHE = 60 * 60 * 24
+GROUP_REGISTRY_CACHE = 60 * 60 * 24
+KEYSET_PAGINATION = False
+FEED_FANOUT_LIMIT = 1000
+FEED_BATCH_SIZE = 500
+TRANSFER_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+POST_LIST_DEFERRED_FIELDS = (
+    'group__description',
+    'author__password',
+    'author__last_login',
+    'author__is_superuser',
+    'author__email',
+    'author__is_staff',
+    'author__is_active',
+    'author__date_joined',
+)
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+THUMBNAIL_WORKERS = 2
+IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+IMAGE_VARIANT_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+SEARCH_MAX_TERMS = 8
+SEARCH_SNIPPET_TOKENS = 12
+SEARCH_SNIPPET_LENGTH = 200
+SEARCH_WEIGHTS = '1.0, 0.5, 0.5'
+POPULAR_HALF_LIFE_HOURS = 24
+POPULAR_POST_WEIGHT = 1.0
+POPULAR_COMMENT_WEIGHT = 1.0
+POPULAR_WINDOW_DAYS = 7
+SUGGESTIONS_PER_USER = 20
+SUGGESTIONS_SHOWN = 5
+SUGGESTION_MUTUAL_WEIGHT = 1.0
+SUGGESTION_OVERLAP_WEIGHT = 2.0
+SUGGESTION_MAX_NEIGHBOURS = 500
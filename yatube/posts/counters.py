@@ -0,0 +1,145 @@
+from django.db import models, transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from core.db import primary
+
+from .models import AuthorStats, Comment, Follow, GroupStats, Post
+
+COUNTED_BY = {
+    'post_count': (Post, 'author'),
+    'follower_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'comment_count': (Comment, 'author'),
+}
+
+
+def count_for(author_id):
+    return {
+        field: model.objects.filter(**{f'{lookup}_id': author_id}).count()
+        for field, (model, lookup) in COUNTED_BY.items()
+    }
+
+
+def rebuild_for(author_id):
+    stats, _ = AuthorStats.objects.update_or_create(
+        author_id=author_id,
+        defaults=count_for(author_id)
+    )
+    return stats
+
+
+def rebuild_all():
+    counts = {}
+    for field, (model, lookup) in COUNTED_BY.items():
+        grouped = model.objects.order_by().values(lookup).annotate(
+            count=Count('pk')
+        ).values_list(lookup, 'count')
+        for author_id, count in grouped.iterator():
+            counts.setdefault(author_id, {})[field] = count
+    with transaction.atomic():
+        AuthorStats.objects.all().delete()
+        AuthorStats.objects.bulk_create(
+            (
+                AuthorStats(author_id=author_id, **fields)
+                for author_id, fields in counts.items()
+            ),
+            batch_size=500
+        )
+    return len(counts)
+
+
+def rebuild_comment_counts():
+    """Пересчитывает число комментариев всех постов одним UPDATE."""
+    counts = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(count=Count('pk')).values('count')
+    return Post.objects.update(comment_count=Coalesce(
+        Subquery(counts, output_field=models.IntegerField()), 0
+    ))
+
+
+def shifted(field, delta):
+    """Новое значение счетчика; при расхождении не уходит ниже нуля."""
+    return Greatest(F(field) + delta, 0)
+
+
+def bump_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=shifted('comment_count', delta)
+    )
+
+
+def bump(author_id, field, delta):
+    with transaction.atomic():
+        updated = AuthorStats.objects.filter(author_id=author_id).update(
+            **{field: shifted(field, delta)}
+        )
+        if not updated and delta > 0:
+            rebuild_for(author_id)
+
+
+def latest_group_post(group_id):
+    return Post.objects.filter(group_id=group_id).order_by(
+        '-pub_date'
+    ).values_list('pub_date', flat=True).first()
+
+
+def rebuild_group(group_id):
+    GroupStats.objects.update_or_create(
+        group_id=group_id,
+        defaults={
+            'post_count': Post.objects.filter(group_id=group_id).count(),
+            'last_post_at': latest_group_post(group_id),
+        }
+    )
+
+
+def rebuild_groups():
+    grouped = Post.objects.filter(group__isnull=False).order_by().values(
+        'group'
+    ).annotate(post_count=Count('pk'), last_post_at=Max('pub_date'))
+    with transaction.atomic():
+        GroupStats.objects.all().delete()
+        created = GroupStats.objects.bulk_create(
+            (
+                GroupStats(
+                    group_id=row['group'],
+                    post_count=row['post_count'],
+                    last_post_at=row['last_post_at'],
+                )
+                for row in grouped.iterator()
+            ),
+            batch_size=500
+        )
+    return len(created)
+
+
+def add_group_post(group_id, pub_date):
+    with transaction.atomic():
+        stats = GroupStats.objects.filter(group_id=group_id)
+        if not stats.update(post_count=F('post_count') + 1):
+            rebuild_group(group_id)
+            return
+        stats.filter(
+            Q(last_post_at__lt=pub_date) | Q(last_post_at__isnull=True)
+        ).update(last_post_at=pub_date)
+
+
+def remove_group_post(group_id, pub_date):
+    """Уменьшает счетчик; дата активности пересчитывается только
+    при удалении самого нового поста группы."""
+    with transaction.atomic():
+        stats = GroupStats.objects.filter(group_id=group_id)
+        stats.update(post_count=shifted('post_count', -1))
+        if stats.filter(last_post_at__lte=pub_date).exists():
+            stats.update(last_post_at=latest_group_post(group_id))
+
+
+def get_stats(author):
+    """Счетчики автора; при отсутствии строки пересчитываются."""
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        with primary():
+            return rebuild_for(author.pk)
@@ -0,0 +1,123 @@
+from itertools import islice
+
+from django.db.models import Q
+
+from posts import constants
+
+from .models import AuthorStats, FeedItem, Follow, Post
+
+
+def pulls_feed(author_id):
+    """Посты автора с огромным числом подписчиков не раскладываются
+    по лентам при записи, а подтягиваются при чтении."""
+    return AuthorStats.objects.filter(
+        author_id=author_id,
+        follower_count__gte=constants.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def left_pull_mode(author_id):
+    """Число подписчиков автора только что опустилось ниже порога."""
+    return AuthorStats.objects.filter(
+        author_id=author_id,
+        follower_count=constants.FEED_FANOUT_LIMIT - 1
+    ).exists()
+
+
+def pulled_authors(user):
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__follower_count__gte=constants.FEED_FANOUT_LIMIT
+        ).values_list('author', flat=True)
+    )
+
+
+def bulk_insert(feed_items):
+    feed_items = iter(feed_items)
+    while True:
+        batch = list(islice(feed_items, constants.FEED_BATCH_SIZE))
+        if not batch:
+            break
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    if pulls_feed(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    bulk_insert(
+        FeedItem(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+        for user_id in follower_ids.iterator()
+    )
+
+
+def backfill_follow(follow):
+    if pulls_feed(follow.author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).values_list('pk', 'pub_date')
+    bulk_insert(
+        FeedItem(user_id=follow.user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def backfill_author(author_id):
+    """Раскладывает все посты автора по лентам его подписчиков.
+
+    Пока подписчиков было больше порога, посты автора подтягивались
+    при чтении; ниже порога они должны лежать в лентах.
+    """
+    if pulls_feed(author_id):
+        return
+    rows = Follow.objects.filter(
+        author_id=author_id, author__post__isnull=False
+    ).values_list('user_id', 'author__post__pk', 'author__post__pub_date')
+    bulk_insert(
+        FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id, post_id, pub_date in rows.iterator(
+            chunk_size=constants.FEED_BATCH_SIZE
+        )
+    )
+
+
+def rebuild_all():
+    """Раскладывает по лентам посты всех подписок без дублей.
+
+    Пары подписчик — пост читаются одним запросом и вставляются
+    пачками, а не отдельными запросами на каждую подписку.
+    """
+    rows = Follow.objects.exclude(
+        author__stats__follower_count__gte=constants.FEED_FANOUT_LIMIT
+    ).filter(author__post__isnull=False).values_list(
+        'user_id', 'author__post__pk', 'author__post__pub_date'
+    )
+    bulk_insert(
+        FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id, post_id, pub_date in rows.iterator(
+            chunk_size=constants.FEED_BATCH_SIZE
+        )
+    )
+
+
+def remove_follow(follow):
+    FeedItem.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id
+    ).delete()
+
+
+def feed_for(user):
+    authors = pulled_authors(user)
+    if not authors:
+        return Post.objects.filter(feed_items__user=user).order_by(
+            '-feed_items__pub_date'
+        )
+    return Post.objects.filter(
+        Q(pk__in=FeedItem.objects.filter(user=user).values('post'))
+        | Q(author__in=authors)
+    )
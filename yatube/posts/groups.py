@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.http import Http404
+
+from core.db import primary
+from posts import constants
+
+from .caching import get_generation, group_registry_scope
+from .models import Group
+
+_registry = {'version': None, 'by_slug': {}, 'by_id': {}}
+
+
+def registry_key(version):
+    return f'posts:groups:{version}'
+
+
+def load():
+    """Группы текущего поколения: из памяти процесса, из общего кеша
+    или, если их нет и там, из базы.
+
+    Проверка поколения — одно чтение из кеша, без запросов к базе.
+    """
+    global _registry
+    version = get_generation(group_registry_scope())
+    if _registry['version'] == version:
+        return _registry
+    groups = cache.get(registry_key(version))
+    if groups is None:
+        with primary():
+            groups = list(Group.objects.order_by('title'))
+        cache.set(
+            registry_key(version), groups, constants.GROUP_REGISTRY_CACHE
+        )
+    _registry = {
+        'version': version,
+        'by_slug': {group.slug: group for group in groups},
+        'by_id': {group.pk: group for group in groups},
+    }
+    return _registry
+
+
+def all_groups():
+    return list(load()['by_slug'].values())
+
+
+def get_group(slug):
+    return load()['by_slug'].get(slug)
+
+
+def get_group_by_id(group_id):
+    return load()['by_id'].get(group_id)
+
+
+def get_group_or_404(slug):
+    group = get_group(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    return group
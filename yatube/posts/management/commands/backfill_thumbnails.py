@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from posts import constants
+from posts.models import Post
+from posts.thumbnails import generate_or_log, run_in_background
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры для постов, у которых их еще нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=constants.THUMBNAIL_WORKERS,
+            help='Сколько миниатюр создавать параллельно'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать миниатюры и для постов, где они уже есть'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(image_thumbnail='')
+        post_ids = posts.order_by('pk').values_list(
+            'pk', flat=True
+        ).iterator()
+        total = 0
+        if options['workers'] > 1:
+            executor = ThreadPoolExecutor(max_workers=options['workers'])
+            generate = partial(executor.map, run_in_background)
+        else:
+            executor = None
+            generate = partial(map, generate_or_log)
+        try:
+            while True:
+                batch = list(islice(post_ids, constants.FEED_BATCH_SIZE))
+                if not batch:
+                    break
+                list(generate(batch))
+                total += len(batch)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано постов: {total}')
+        )
@@ -0,0 +1,64 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа и число запросов основных страниц; '
+        'сравнивает результат с прошлым прогоном'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кеш перед каждым запросом'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            help='Замерить только перечисленные сценарии'
+        )
+        parser.add_argument('--output', help='Файл для JSON с результатами')
+        parser.add_argument(
+            '--baseline',
+            help='JSON прошлого прогона для поиска регрессий'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Допустимый рост p95, доля от прошлого значения'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = benchmark.run(
+                options['iterations'], options['cold'], options['only']
+            )
+        except RuntimeError as error:
+            raise CommandError(error)
+        for name, result in report['results'].items():
+            self.stdout.write(
+                f'{name:<14} p50 {result["p50"]:>9.2f} мс  '
+                f'p95 {result["p95"]:>9.2f} мс  '
+                f'запросов {result["queries"]}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as stream:
+                baseline = json.load(stream)
+            found = benchmark.regressions(
+                report, baseline, options['threshold']
+            )
+            if found:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(found)
+                )
+        self.stdout.write(self.style.SUCCESS('Замеры завершены'))
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI и ASGI при одновременных '
+        'запросах к страницам чтения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Сколько запросов выполняется одновременно'
+        )
+        parser.add_argument('--output', help='Файл для JSON с результатами')
+
+    def handle(self, *args, **options):
+        try:
+            report = benchmark.throughput(
+                options['requests'], options['concurrency']
+            )
+        except RuntimeError as error:
+            raise CommandError(error)
+        for name, result in report['results'].items():
+            self.stdout.write(
+                f'{name:<5} {result["rps"]:>8.1f} запросов/с  '
+                f'p50 {result["p50"]:>9.2f} мс  '
+                f'p95 {result["p95"]:>9.2f} мс  '
+                f'ошибок {result["errors"]}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS('Замеры завершены'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.suggestions import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации подписок по графу подписок: '
+        'друзья друзей и пользователи с похожими подписками'
+    )
+
+    def handle(self, *args, **options):
+        total = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Сохранено рекомендаций: {total}')
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import FORMATS, MODELS, export_rows, format_for, write_rows
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии или подписки потоком'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=MODELS)
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат выгрузки; по умолчанию по расширению файла'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки; по умолчанию стандартный вывод'
+        )
+
+    def handle(self, *args, **options):
+        data_format = options['format'] or format_for(options['output'])
+        rows = export_rows(options['model'])
+        if not options['output']:
+            write_rows(options['model'], rows, self.stdout, data_format)
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as stream:
+            write_rows(options['model'], rows, stream, data_format)
+        self.stdout.write(
+            self.style.SUCCESS(f'Выгрузка записана в {options["output"]}')
+        )
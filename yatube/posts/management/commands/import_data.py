@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (FORMATS, MODELS, Importer, format_for, read_rows,
+                            rebuild_derived)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии или подписки из JSON Lines '
+        'или CSV пачками через bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=MODELS)
+        parser.add_argument(
+            'path',
+            help='Файл с данными; «-» — стандартный ввод'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат данных; по умолчанию по расширению файла'
+        )
+        parser.add_argument(
+            '--source',
+            default='',
+            help=(
+                'Имя источника выгрузки: id постов сопоставляются '
+                'только внутри одного источника'
+            )
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help=(
+                'Не пересчитывать счетчики, ленты и поисковый индекс: '
+                'удобно, если загрузок несколько подряд'
+            )
+        )
+
+    def handle(self, *args, **options):
+        data_format = options['format'] or format_for(options['path'])
+        importer = Importer(source=options['source'])
+        if options['path'] == '-':
+            total = importer.run(
+                options['model'], read_rows(sys.stdin, data_format)
+            )
+        else:
+            with open(options['path'], encoding='utf-8',
+                      newline='') as stream:
+                total = importer.run(
+                    options['model'], read_rows(stream, data_format)
+                )
+        if not options['no_rebuild']:
+            rebuild_derived(importer.scopes)
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {total}, пропущено: {importer.skipped}'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import (rebuild_all, rebuild_comment_counts,
+                            rebuild_groups)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики авторов, постов и групп'
+
+    def handle(self, *args, **options):
+        total = rebuild_all()
+        posts = rebuild_comment_counts()
+        groups = rebuild_groups()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счетчики пересчитаны для {total} авторов, {posts} постов '
+            f'и {groups} групп'
+        ))
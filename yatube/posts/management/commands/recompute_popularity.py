@@ -0,0 +1,36 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import constants
+from posts.popularity import recompute
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярность постов с нуля; запускается '
+        'периодически, чтобы учесть удаленные комментарии'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=constants.POPULAR_WINDOW_DAYS,
+            help='Пересчитать посты за последние N дней'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересчитать все посты'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if not options['all']:
+            since = timezone.now() - dt.timedelta(days=options['days'])
+        total = recompute(since)
+        self.stdout.write(
+            self.style.SUCCESS(f'Популярность пересчитана: {total} постов')
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.benchmark import seed
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу случайными пользователями, постами и подписками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Зерно генератора для воспроизводимых данных'
+        )
+
+    def handle(self, *args, **options):
+        prefix = seed(
+            options['users'],
+            options['groups'],
+            options['posts'],
+            options['comments'],
+            options['follows'],
+            random_seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы, пользователи с префиксом {prefix}_'
+        ))
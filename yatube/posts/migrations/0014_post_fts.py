@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5('
+        " text, group_title, author_name, tokenize='unicode61'"
+        ')'
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_post_fts (rowid, text, group_title, author_name)'
+        " SELECT p.id, p.text, COALESCE(g.title, ''),"
+        " u.first_name || ' ' || u.last_name || ' ' || u.username"
+        ' FROM posts_post p'
+        ' JOIN auth_user u ON u.id = p.author_id'
+        ' LEFT JOIN posts_group g ON g.id = p.group_id'
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_postimagevariant'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.models import Count
+
+COUNTED_BY = {
+    'post_count': ('Post', 'author'),
+    'follower_count': ('Follow', 'author'),
+    'following_count': ('Follow', 'user'),
+    'comment_count': ('Comment', 'author'),
+}
+
+
+def fill_author_stats(apps, schema_editor):
+    """То же, что counters.rebuild_all, на исторических моделях."""
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    counts = {}
+    for field, (model_name, lookup) in COUNTED_BY.items():
+        model = apps.get_model('posts', model_name)
+        grouped = model.objects.order_by().values(lookup).annotate(
+            count=Count('pk')
+        ).values_list(lookup, 'count')
+        for author_id, count in grouped.iterator():
+            counts.setdefault(author_id, {})[field] = count
+    AuthorStats.objects.all().delete()
+    AuthorStats.objects.bulk_create(
+        (
+            AuthorStats(author_id=author_id, **fields)
+            for author_id, fields in counts.items()
+        ),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_followsuggestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
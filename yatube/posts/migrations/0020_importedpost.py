@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_fill_authorstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedPost',
+            fields=[
+                ('source_id', models.PositiveIntegerField(primary_key=True, serialize=False, verbose_name='Id в выгрузке')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Загруженный пост',
+                'verbose_name_plural': 'Загруженные посты',
+            },
+        ),
+    ]
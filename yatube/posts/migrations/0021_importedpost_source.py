@@ -0,0 +1,54 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_imported_posts(apps, schema_editor):
+    """Переносит связи прошлых загрузок в источник по умолчанию."""
+    ImportedPost = apps.get_model('posts', 'ImportedPost')
+    NewImportedPost = apps.get_model('posts', 'NewImportedPost')
+    NewImportedPost.objects.bulk_create(
+        (
+            NewImportedPost(source_id=source_id, post_id=post_id)
+            for source_id, post_id in ImportedPost.objects.values_list(
+                'source_id', 'post_id'
+            ).iterator()
+        ),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_importedpost'),
+    ]
+
+    # Первичный ключ source_id не перенести изменением поля: таблица
+    # создается заново, а старые строки копируются в нее.
+    operations = [
+        migrations.CreateModel(
+            name='NewImportedPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(blank=True, default='', max_length=100, verbose_name='Источник')),
+                ('source_id', models.PositiveIntegerField(verbose_name='Id в выгрузке')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Загруженный пост',
+                'verbose_name_plural': 'Загруженные посты',
+            },
+        ),
+        migrations.RunPython(copy_imported_posts, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='ImportedPost',
+        ),
+        migrations.RenameModel(
+            old_name='NewImportedPost',
+            new_name='ImportedPost',
+        ),
+        migrations.AddConstraint(
+            model_name='importedpost',
+            constraint=models.UniqueConstraint(fields=('source', 'source_id'), name='unique_imported_post'),
+        ),
+    ]
@@ -6,6 +6,17 @@ from posts import constants
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def for_list(self):
+        """Посты для ленты: автор и группа одним запросом
+        и без неиспользуемых колонок."""
+        return self.select_related('author', 'group').prefetch_related(
+            'image_variants'
+        ).defer(
+            *constants.POST_LIST_DEFERRED_FIELDS
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -15,6 +26,10 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -34,15 +49,54 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    image_thumbnail = models.ImageField(
+        'Миниатюра',
+        blank=True,
+        editable=False
+    )
+    comment_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:constants.TEXT_PREVIEW]
 
+    def image_sources(self):
+        """Пары (MIME-тип, srcset) от самого компактного формата."""
+        sources = {}
+        for variant in self.image_variants.all():
+            sources.setdefault(variant.format, []).append(
+                f'{variant.image.url} {variant.width}w'
+            )
+        return [
+            (f'image/{image_format.lower()}', ', '.join(sources[image_format]))
+            for image_format in constants.IMAGE_VARIANT_FORMATS
+            if image_format in sources
+        ]
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200, unique=True)
@@ -74,6 +128,12 @@ class Comment(models.Model):
         ordering = ['-created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -90,3 +150,223 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='prevent_self_follow'
+            ),
+        ]
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_items'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_item'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='feed_user_pub_date_idx'
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    post_count = models.PositiveIntegerField('Постов', default=0)
+    follower_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    comment_count = models.PositiveIntegerField('Комментариев', default=0)
+
+    class Meta:
+        verbose_name = 'Счетчики автора'
+        verbose_name_plural = 'Счетчики авторов'
+
+    def __str__(self):
+        return str(self.author)
+
+
+class GroupStats(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа'
+    )
+    post_count = models.PositiveIntegerField('Постов', default=0)
+    last_post_at = models.DateTimeField(
+        'Последний пост',
+        blank=True,
+        null=True
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики группы'
+        verbose_name_plural = 'Счетчики групп'
+
+    def __str__(self):
+        return str(self.group)
+
+
+class PostScore(models.Model):
+    """Популярность поста в логарифмической шкале.
+
+    Хранится log(sum(w * exp(k * t))) по событиям поста: общий для
+    всех постов множитель затухания exp(-k * now) не меняет порядок,
+    поэтому старые оценки не нужно пересчитывать со временем.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Пост'
+    )
+    value = models.FloatField('Популярность')
+    comment_value = models.FloatField(
+        'Вклад комментариев',
+        blank=True,
+        null=True
+    )
+
+    class Meta:
+        verbose_name = 'Популярность поста'
+        verbose_name_plural = 'Популярность постов'
+        indexes = [
+            models.Index(
+                fields=['-value', '-post'],
+                name='post_score_value_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.post_id)
+
+
+class FollowSuggestion(models.Model):
+    """Автор, на которого стоит подписаться; пересчитывается пачкой
+    командой compute_suggestions."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggestions'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField('Оценка')
+    mutual = models.PositiveIntegerField('Читают ваши авторы', default=0)
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow_suggestion'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='suggestion_user_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class ImportedPost(models.Model):
+    """Пост из выгрузки: по его id в выгрузке комментарии находят пост
+    в базе, даже если загружаются отдельной командой.
+
+    Id уникальны только внутри источника: выгрузки разных сайтов
+    могут использовать одни и те же id.
+    """
+    source = models.CharField(
+        'Источник',
+        max_length=100,
+        blank=True,
+        default=''
+    )
+    source_id = models.PositiveIntegerField('Id в выгрузке')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост'
+    )
+
+    class Meta:
+        verbose_name = 'Загруженный пост'
+        verbose_name_plural = 'Загруженные посты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'source_id'],
+                name='unique_imported_post'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.source}:{self.source_id} -> {self.post_id}'
+
+
+class PostImageVariant(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_variants'
+    )
+    image = models.ImageField('Картинка')
+    format = models.CharField('Формат', max_length=10)
+    width = models.PositiveSmallIntegerField('Ширина')
+    height = models.PositiveSmallIntegerField('Высота')
+
+    class Meta:
+        ordering = ['width']
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'format', 'width'],
+                name='unique_image_variant'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.format} {self.width}x{self.height}'
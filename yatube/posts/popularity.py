@@ -0,0 +1,148 @@
+import datetime as dt
+import math
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from posts import constants
+
+from .models import AuthorStats, Comment, Post, PostScore
+
+EPOCH = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def decay_rate():
+    """Скорость затухания в секунду: вес события за период полураспада
+    падает вдвое."""
+    return math.log(2) / (constants.POPULAR_HALF_LIFE_HOURS * 60 * 60)
+
+
+def log_event(weight, moment):
+    return math.log(weight) + decay_rate() * (moment - EPOCH).total_seconds()
+
+
+def logaddexp(first, second):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    high = max(first, second)
+    return high + math.log1p(math.exp(-abs(first - second)))
+
+
+def post_event(pub_date, followers):
+    """Вклад самого поста: растет с числом подписчиков автора."""
+    return log_event(
+        constants.POPULAR_POST_WEIGHT * (1 + math.log1p(followers)),
+        pub_date
+    )
+
+
+def comments_event(created_dates):
+    value = None
+    for created in created_dates:
+        value = logaddexp(
+            value, log_event(constants.POPULAR_COMMENT_WEIGHT, created)
+        )
+    return value
+
+
+def followers_of(author_id):
+    return AuthorStats.objects.filter(author_id=author_id).values_list(
+        'follower_count', flat=True
+    ).first() or 0
+
+
+def build_score(post, followers, comment_value):
+    return PostScore(
+        post_id=post.pk,
+        value=logaddexp(post_event(post.pub_date, followers), comment_value),
+        comment_value=comment_value,
+    )
+
+
+def recompute_post(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'pub_date', 'author_id'
+    ).first()
+    if post is None:
+        return
+    comment_value = comments_event(
+        Comment.objects.filter(post_id=post_id).values_list(
+            'created', flat=True
+        ).iterator()
+    )
+    score = build_score(post, followers_of(post.author_id), comment_value)
+    PostScore.objects.update_or_create(
+        post_id=post_id,
+        defaults={'value': score.value, 'comment_value': comment_value}
+    )
+
+
+def add_comment(comment):
+    """Добавляет вклад комментария, не перечитывая остальные."""
+    event = log_event(constants.POPULAR_COMMENT_WEIGHT, comment.created)
+    with transaction.atomic():
+        score = PostScore.objects.select_for_update().filter(
+            pk=comment.post_id
+        ).first()
+        if score is None:
+            recompute_post(comment.post_id)
+            return
+        score.comment_value = logaddexp(score.comment_value, event)
+        score.value = logaddexp(score.value, event)
+        score.save(update_fields=['value', 'comment_value'])
+
+
+def rescore_author(author_id):
+    """Пересчитывает вклад подписчиков у свежих постов автора."""
+    followers = followers_of(author_id)
+    since = timezone.now() - dt.timedelta(
+        days=constants.POPULAR_WINDOW_DAYS
+    )
+    scores = list(PostScore.objects.filter(
+        post__author_id=author_id,
+        post__pub_date__gte=since
+    ).select_related('post').only(
+        'value', 'comment_value', 'post__pub_date'
+    ))
+    for score in scores:
+        score.value = logaddexp(
+            post_event(score.post.pub_date, followers), score.comment_value
+        )
+    PostScore.objects.bulk_update(scores, ['value'], batch_size=500)
+
+
+def recompute(since=None):
+    """Пересчитывает оценки пачками; возвращает число постов."""
+    posts = Post.objects.order_by('pk').only('pk', 'pub_date', 'author_id')
+    if since is not None:
+        posts = posts.filter(pub_date__gte=since)
+    posts = posts.iterator()
+    total = 0
+    while True:
+        batch = list(islice(posts, constants.TRANSFER_BATCH_SIZE))
+        if not batch:
+            break
+        ids = [post.pk for post in batch]
+        followers = dict(AuthorStats.objects.filter(
+            author_id__in={post.author_id for post in batch}
+        ).values_list('author_id', 'follower_count'))
+        created = {}
+        for post_id, date in Comment.objects.filter(
+            post_id__in=ids
+        ).values_list('post_id', 'created').iterator():
+            created.setdefault(post_id, []).append(date)
+        with transaction.atomic():
+            PostScore.objects.filter(post_id__in=ids).delete()
+            PostScore.objects.bulk_create(
+                build_score(
+                    post,
+                    followers.get(post.author_id, 0),
+                    comments_event(created.get(post.pk, ()))
+                )
+                for post in batch
+            )
+        total += len(batch)
+    return total
@@ -0,0 +1,168 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from posts import constants
+
+from .models import Post
+from .utils import CursorPage, KeysetPaginator, decode_cursor, encode_cursor
+
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+
+def terms(query):
+    return re.findall(r'\w+', query.lower())[:constants.SEARCH_MAX_TERMS]
+
+
+def highlight(snippet):
+    """Экранирует фрагмент и заменяет маркеры совпадений на <mark>."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchBackend:
+    """Интерфейс поиска; по умолчанию индекс не нужен."""
+
+    def index_posts(self, **filters):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, cursor=None):
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """Поиск через LIKE для баз без полнотекстового индекса."""
+
+    def search(self, query, cursor=None):
+        words = terms(query)
+        if not words:
+            return CursorPage([])
+        condition = Q()
+        for word in words:
+            condition &= (
+                Q(text__icontains=word)
+                | Q(group__title__icontains=word)
+                | Q(author__username__icontains=word)
+                | Q(author__first_name__icontains=word)
+                | Q(author__last_name__icontains=word)
+            )
+        paginator = KeysetPaginator(
+            Post.objects.for_list().filter(condition),
+            constants.POST_PER_PAGE
+        )
+        page = paginator.get_page(cursor)
+        pattern = re.compile(
+            '|'.join(re.escape(word) for word in words), re.IGNORECASE
+        )
+        for post in page:
+            text = post.text[:constants.SEARCH_SNIPPET_LENGTH]
+            post.snippet = highlight(pattern.sub(
+                lambda match: f'{MARK_START}{match.group()}{MARK_END}', text
+            ))
+        return page
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Ранжированный поиск по виртуальной таблице FTS5."""
+    table = 'posts_post_fts'
+
+    def index_posts(self, **filters):
+        """Переиндексирует посты одним INSERT ... SELECT."""
+        where, params = '', []
+        if filters:
+            (column, value), = filters.items()
+            where, params = f'WHERE p.{column} = %s', [value]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {self.table}'
+                ' (rowid, text, group_title, author_name)'
+                ' SELECT p.id, p.text, COALESCE(g.title, \'\'),'
+                " u.first_name || ' ' || u.last_name || ' ' || u.username"
+                ' FROM posts_post p'
+                ' JOIN auth_user u ON u.id = p.author_id'
+                ' LEFT JOIN posts_group g ON g.id = p.group_id'
+                f' {where}',
+                params
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        self.index_posts()
+
+    def decode_position(self, cursor):
+        """Ранг и id последнего результата или None для плохого курсора."""
+        try:
+            rank, post_id = decode_cursor(cursor)
+            return float(rank), int(post_id)
+        except (TypeError, ValueError):
+            return None
+
+    def search(self, query, cursor=None):
+        words = terms(query)
+        if not words:
+            return CursorPage([])
+        match = ' '.join(f'"{word}"*' for word in words)
+        position = self.decode_position(cursor) if cursor else None
+        after, params = '', [match]
+        if position is not None:
+            rank, post_id = position
+            after = 'WHERE rank > %s OR (rank = %s AND id > %s)'
+            params += [rank, rank, post_id]
+        params.append(constants.POST_PER_PAGE + 1)
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(
+                'SELECT id, rank, snippet FROM ('
+                ' SELECT rowid AS id,'
+                f' bm25({self.table}, {constants.SEARCH_WEIGHTS}) AS rank,'
+                f' snippet({self.table}, 0, char(2), char(3), \'…\','
+                f' {constants.SEARCH_SNIPPET_TOKENS}) AS snippet'
+                f' FROM {self.table} WHERE {self.table} MATCH %s'
+                f') {after} ORDER BY rank, id LIMIT %s',
+                params
+            )
+            rows = db_cursor.fetchall()
+        has_next = len(rows) > constants.POST_PER_PAGE
+        rows = rows[:constants.POST_PER_PAGE]
+        posts = Post.objects.for_list().in_bulk([row[0] for row in rows])
+        results = []
+        for post_id, rank, snippet in rows:
+            post = posts.get(post_id)
+            if post is None:
+                continue
+            post.snippet = highlight(snippet)
+            results.append(post)
+        next_cursor = None
+        if has_next:
+            next_cursor = encode_cursor([rows[-1][1], rows[-1][0]])
+        return CursorPage(results, next_cursor)
+
+
+def get_backend():
+    backend = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+    if backend:
+        return import_string(backend)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return DatabaseSearchBackend()
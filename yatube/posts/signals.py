@@ -0,0 +1,230 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import (caching, counters, feed, search, suggestions, tasks,
+               thumbnails)
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+def count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Follow)
+def count_deleted(sender, instance, **kwargs):
+    update_counters(instance, -1)
+
+
+def update_counters(instance, delta):
+    if isinstance(instance, Follow):
+        counters.bump(instance.author_id, 'follower_count', delta)
+        counters.bump(instance.user_id, 'following_count', delta)
+    elif isinstance(instance, Comment):
+        counters.bump(instance.author_id, 'comment_count', delta)
+        counters.bump_comment_count(instance.post_id, delta)
+    else:
+        counters.bump(instance.author_id, 'post_count', delta)
+        if instance.group_id and delta > 0:
+            counters.add_group_post(instance.group_id, instance.pub_date)
+        elif instance.group_id:
+            counters.remove_group_post(instance.group_id, instance.pub_date)
+
+
+@receiver(post_save, sender=Post)
+def move_group_post(sender, instance, created, raw=False, **kwargs):
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if created or raw or old_group_id == instance.group_id:
+        return
+    if old_group_id:
+        counters.remove_group_post(old_group_id, instance.pub_date)
+    if instance.group_id:
+        counters.add_group_post(instance.group_id, instance.pub_date)
+
+
+@receiver(post_save, sender=Post)
+def score_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        tasks.score_post.delay(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def score_comment(sender, instance, created, raw=False, **kwargs):
+    # Удаления учитывает периодический пересчет: при каскадном удалении
+    # поста пересчет на каждый комментарий был бы квадратичным.
+    if created and not raw:
+        tasks.score_comment.delay(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def rescore_author(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tasks.rescore_author.delay(
+            instance.author_id, key=f'rescore-author:{instance.author_id}'
+        )
+
+
+@receiver(post_save, sender=Follow)
+def drop_suggestion(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        suggestions.drop(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        tasks.fan_out_post.delay(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        tasks.backfill_follow.delay(instance.pk)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_feed(sender, instance, **kwargs):
+    feed.remove_follow(instance)
+    if feed.left_pull_mode(instance.author_id):
+        tasks.backfill_author.delay(
+            instance.author_id, key=f'backfill-author:{instance.author_id}'
+        )
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, raw=False, **kwargs):
+    instance._old_group_slug = None
+    instance._old_group_id = None
+    instance._image_changed = bool(instance.image)
+    if instance.pk is None or raw:
+        return
+    old_group_id, old_slug, old_image = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group_id', 'group__slug', 'image').first() or (
+        None, None, ''
+    )
+    instance._old_group_id = old_group_id
+    instance._old_group_slug = old_slug
+    instance._image_changed = old_image != instance.image.name
+    if instance._image_changed:
+        instance.image_thumbnail = ''
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, raw=False, **kwargs):
+    instance._old_group_slug = None
+    if instance.pk is None or raw:
+        return
+    instance._old_group_slug = Group.objects.filter(
+        pk=instance.pk
+    ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnail(sender, instance, created, raw=False, **kwargs):
+    if raw or not instance._image_changed:
+        return
+    if not created:
+        instance.image_variants.all().delete()
+    if instance.image:
+        thumbnails.schedule_thumbnail(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    scopes = caching.post_scopes(instance)
+    old_slug = getattr(instance, '_old_group_slug', None)
+    if old_slug:
+        scopes.append(caching.group_scope(old_slug))
+        scopes.append(caching.groups_scope())
+    caching.bump_generations(*scopes)
+
+
+@receiver(pre_delete, sender=Group)
+def touch_group_posts(sender, instance, **kwargs):
+    instance.posts.update(updated=timezone.now())
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    scopes = [
+        caching.group_scope(instance.slug),
+        caching.groups_scope(),
+        caching.group_registry_scope(),
+    ]
+    old_slug = getattr(instance, '_old_group_slug', None)
+    if old_slug:
+        scopes.append(caching.group_scope(old_slug))
+    if kwargs.get('signal') is post_delete:
+        scopes.append(caching.index_scope())
+    caching.bump_generations(*scopes)
+    # Реестр могли перечитать из базы до коммита: после коммита
+    # поколение сдвигается еще раз.
+    transaction.on_commit(
+        lambda: caching.bump_generations(caching.group_registry_scope())
+    )
+
+
+def profile_changed(update_fields):
+    return not update_fields or bool(
+        set(update_fields) & {'username', 'first_name', 'last_name'}
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_profile_page(sender, instance, update_fields=None, **kwargs):
+    if profile_changed(update_fields):
+        caching.bump_generations(caching.profile_scope(instance.username))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_counter_pages(sender, instance, **kwargs):
+    users = [instance.author]
+    scopes = []
+    if sender is Follow:
+        users.append(instance.user)
+    else:
+        # Число комментариев есть в списках постов: главной, группы
+        # и профиля автора поста.
+        scopes += caching.post_page_scopes(instance.post_id)
+        scopes.append(caching.index_scope())
+    caching.bump_generations(
+        *scopes, *(caching.profile_scope(user.username) for user in users)
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    tasks.index_post.delay(instance.pk, key=f'index-post:{instance.pk}')
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def index_group_posts(sender, instance, created, **kwargs):
+    if not created:
+        search.get_backend().index_posts(group_id=instance.pk)
+
+
+@receiver(post_save, sender=User)
+def index_author_posts(sender, instance, created, update_fields=None,
+                       **kwargs):
+    if not created and profile_changed(update_fields):
+        search.get_backend().index_posts(author_id=instance.pk)
@@ -0,0 +1,114 @@
+import heapq
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.db import transaction
+
+from posts import constants
+
+from .caching import bump_generations, suggestions_scope
+
+from .models import Follow, FollowSuggestion, User
+
+
+def load_graph():
+    """Граф подписок в памяти: кто на кого подписан и кто на кого."""
+    following = defaultdict(set)
+    followers = defaultdict(set)
+    for user_id, author_id in Follow.objects.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        following[user_id].add(author_id)
+        followers[author_id].add(user_id)
+    return following, followers
+
+
+def candidates(user_id, following, followers):
+    """Оценки авторов для пользователя.
+
+    Авторы, которых читают его авторы, получают вес за каждого такого
+    автора. Авторы, которых читают пользователи с похожими подписками,
+    получают вес по мере сходства (коэффициент Жаккара).
+    """
+    followed = following.get(user_id, set())
+    if not followed:
+        return {}
+    mutual = Counter()
+    for author_id in followed:
+        mutual.update(following.get(author_id, ()))
+    overlap = Counter()
+    for author_id in followed:
+        neighbours = followers[author_id]
+        if len(neighbours) <= constants.SUGGESTION_MAX_NEIGHBOURS:
+            overlap.update(neighbours)
+    scores = Counter({
+        author_id: count * constants.SUGGESTION_MUTUAL_WEIGHT
+        for author_id, count in mutual.items()
+    })
+    for neighbour_id, shared in overlap.items():
+        if neighbour_id == user_id:
+            continue
+        neighbour_followed = following[neighbour_id]
+        similarity = shared / len(followed | neighbour_followed)
+        weight = similarity * constants.SUGGESTION_OVERLAP_WEIGHT
+        for author_id in neighbour_followed - followed:
+            scores[author_id] += weight
+    excluded = followed | {user_id}
+    best = heapq.nlargest(
+        constants.SUGGESTIONS_PER_USER,
+        (item for item in scores.items() if item[0] not in excluded),
+        key=lambda item: (item[1], -item[0])
+    )
+    return {
+        author_id: (score, mutual[author_id]) for author_id, score in best
+    }
+
+
+def rebuild():
+    """Пересчитывает рекомендации всех пользователей пачками;
+    возвращает число сохраненных рекомендаций."""
+    following, followers = load_graph()
+    users = User.objects.order_by('pk').values_list('pk', flat=True)
+    users = users.iterator()
+    total = 0
+    while True:
+        batch = list(islice(users, constants.TRANSFER_BATCH_SIZE))
+        if not batch:
+            break
+        rows = [
+            FollowSuggestion(
+                user_id=user_id,
+                author_id=author_id,
+                score=score,
+                mutual=mutual
+            )
+            for user_id in batch
+            for author_id, (score, mutual) in candidates(
+                user_id, following, followers
+            ).items()
+        ]
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=batch).delete()
+            FollowSuggestion.objects.bulk_create(rows)
+        total += len(rows)
+    bump_generations(suggestions_scope())
+    return total
+
+
+def suggestions_for(user, limit=None):
+    """Готовые рекомендации пользователя, без обхода графа."""
+    if not user.is_authenticated:
+        return FollowSuggestion.objects.none()
+    return FollowSuggestion.objects.filter(user=user).select_related(
+        'author'
+    ).only(
+        'score', 'mutual', 'author', 'author__username',
+        'author__first_name', 'author__last_name'
+    )[:limit or constants.SUGGESTIONS_SHOWN]
+
+
+def drop(user_id, author_id):
+    """Убирает рекомендацию автора, на которого уже подписались."""
+    FollowSuggestion.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()
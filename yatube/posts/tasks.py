@@ -0,0 +1,54 @@
+from tasks.queue import task
+
+from . import feed, popularity, search, thumbnails
+from .models import Comment, Follow, Post
+
+
+@task('posts.generate_thumbnail')
+def generate_thumbnail(post_id):
+    thumbnails.generate_thumbnail(post_id)
+
+
+@task('posts.fan_out_post')
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'pub_date', 'author_id'
+    ).first()
+    if post is not None:
+        feed.fan_out_post(post)
+
+
+@task('posts.backfill_follow')
+def backfill_follow(follow_id):
+    follow = Follow.objects.filter(pk=follow_id).first()
+    if follow is not None:
+        feed.backfill_follow(follow)
+
+
+@task('posts.backfill_author')
+def backfill_author(author_id):
+    feed.backfill_author(author_id)
+
+
+@task('posts.index_post')
+def index_post(post_id):
+    search.get_backend().index_posts(id=post_id)
+
+
+@task('posts.score_post')
+def score_post(post_id):
+    popularity.recompute_post(post_id)
+
+
+@task('posts.score_comment')
+def score_comment(comment_id):
+    comment = Comment.objects.filter(pk=comment_id).only(
+        'post_id', 'created'
+    ).first()
+    if comment is not None:
+        popularity.add_comment(comment)
+
+
+@task('posts.rescore_author')
+def rescore_author(author_id):
+    popularity.rescore_author(author_id)
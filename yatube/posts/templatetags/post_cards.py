@@ -0,0 +1,38 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import constants
+from posts.caching import hashed
+
+register = template.Library()
+
+
+def post_card_key(post, options):
+    """Ключ карточки меняется вместе со всем, что читает шаблон: постом,
+    картинками, именем и логином автора, группой."""
+    version = hashed(':'.join(map(str, (
+        post.updated.isoformat() if post.updated else '',
+        post.image.name,
+        post.image_thumbnail.name,
+        post.author.get_full_name(),
+        post.author.username,
+        post.group.slug if post.group_id else '',
+        *sorted(options.items()),
+    ))))
+    return f'posts:card:{post.pk}:{version}'
+
+
+@register.simple_tag
+def post_card(post, **options):
+    """Карточка поста: HTML берется из кеша, шаблон рендерится
+    только для новых версий поста."""
+    key = post_card_key(post, options)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(
+            'posts/includes/post_card.html', {'post': post, **options}
+        )
+        cache.set(key, html, constants.POST_CARD_CACHE)
+    return mark_safe(html)
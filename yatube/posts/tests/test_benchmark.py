@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.models import Follow, Group, Post, User
+
+
+class BenchmarkCommandsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.report_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        call_command(
+            'seed_data', users=10, groups=2, posts=30, comments=20,
+            follows=30, seed=1, stdout=StringIO()
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.report_dir, ignore_errors=True)
+
+    def test_seed_data_creates_dataset(self):
+        """seed_data создает пользователей, группы, посты и подписки"""
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertTrue(Follow.objects.exists())
+
+    def test_benchmark_writes_report_without_side_effects(self):
+        """benchmark сохраняет JSON с процентилями и откатывает записи"""
+        output = os.path.join(self.report_dir, 'report.json')
+        call_command(
+            'benchmark', iterations=3, output=output, stdout=StringIO()
+        )
+        with open(output, encoding='utf-8') as stream:
+            report = json.load(stream)
+        self.assertEqual(set(report['results']), {
+            'index', 'popular', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create', 'add_comment',
+        })
+        for result in report['results'].values():
+            self.assertLessEqual(result['p50'], result['p99'])
+            self.assertIn('queries', result)
+        self.assertEqual(Post.objects.count(), 30)
+
+    def test_benchmark_fails_on_regression(self):
+        """benchmark падает, если результат хуже прошлого прогона"""
+        baseline = os.path.join(self.report_dir, 'baseline.json')
+        with open(baseline, 'w', encoding='utf-8') as stream:
+            json.dump({'results': {
+                'index': {'p95': 0.0001, 'queries': 0},
+            }}, stream)
+        with self.assertRaisesMessage(CommandError, 'index'):
+            call_command(
+                'benchmark', iterations=2, only=['index'],
+                baseline=baseline, stdout=StringIO()
+            )
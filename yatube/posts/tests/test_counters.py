@@ -0,0 +1,137 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.counters import get_stats
+from posts.models import AuthorStats, Comment, Follow, Group, GroupStats, Post
+
+User = get_user_model()
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def stats(self, user):
+        return AuthorStats.objects.get(author=user)
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счетчики меняются при создании и удалении объектов"""
+        post = Post.objects.create(text='Тестовый пост', author=self.author)
+        Post.objects.create(text='Еще один пост', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        author_stats = self.stats(self.author)
+        reader_stats = self.stats(self.reader)
+        self.assertEqual(author_stats.post_count, 2)
+        self.assertEqual(author_stats.follower_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(reader_stats.comment_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+        follow.delete()
+        post.delete()
+        author_stats = self.stats(self.author)
+        reader_stats = self.stats(self.reader)
+        self.assertEqual(author_stats.post_count, 1)
+        self.assertEqual(author_stats.follower_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+        self.assertEqual(reader_stats.comment_count, 0)
+
+    def test_missing_stats_are_rebuilt_on_read(self):
+        """Отсутствующие счетчики пересчитываются при чтении"""
+        Post.objects.create(text='Тестовый пост', author=self.author)
+        AuthorStats.objects.all().delete()
+        self.assertEqual(get_stats(self.author).post_count, 1)
+
+    def test_rebuild_counters_command_fixes_drift(self):
+        """Команда rebuild_counters исправляет разошедшиеся счетчики"""
+        post = Post.objects.create(text='Тестовый пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        AuthorStats.objects.filter(author=self.author).update(
+            post_count=42, follower_count=7
+        )
+        Post.objects.filter(pk=post.pk).update(comment_count=5)
+        call_command('rebuild_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        author_stats = self.stats(self.author)
+        self.assertEqual(author_stats.post_count, 1)
+        self.assertEqual(author_stats.follower_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+    def test_drifted_counters_do_not_go_negative(self):
+        """Уменьшение разошедшегося счетчика останавливается на нуле"""
+        group = Group.objects.create(title='Группа', slug='drift')
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.author, group=group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        AuthorStats.objects.update(post_count=0, comment_count=0)
+        GroupStats.objects.update(post_count=0)
+        Post.objects.filter(pk=post.pk).update(comment_count=0)
+        post.delete()
+        self.assertEqual(self.stats(self.author).post_count, 0)
+        self.assertEqual(self.stats(self.reader).comment_count, 0)
+        self.assertEqual(GroupStats.objects.get(group=group).post_count, 0)
+
+
+class GroupStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Первая группа', slug='first', description='Описание'
+        )
+        cls.other = Group.objects.create(
+            title='Вторая группа', slug='second', description='Описание'
+        )
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_group_stats_follow_posts(self):
+        """Счетчики группы следят за созданием, переносом и удалением"""
+        old = Post.objects.create(
+            text='Старый пост', author=self.author, group=self.group
+        )
+        new = Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group
+        )
+        self.assertEqual(self.stats(self.group).post_count, 2)
+        self.assertEqual(self.stats(self.group).last_post_at, new.pub_date)
+
+        new.group = self.other
+        new.save()
+        self.assertEqual(self.stats(self.group).post_count, 1)
+        self.assertEqual(self.stats(self.group).last_post_at, old.pub_date)
+        self.assertEqual(self.stats(self.other).post_count, 1)
+
+        old.delete()
+        self.assertEqual(self.stats(self.group).post_count, 0)
+        self.assertIsNone(self.stats(self.group).last_post_at)
+
+    def test_rebuild_counters_fixes_group_stats(self):
+        """Команда rebuild_counters пересчитывает счетчики групп"""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        GroupStats.objects.all().delete()
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(self.stats(self.group).post_count, 1)
+        self.assertEqual(self.stats(self.group).last_post_at, post.pub_date)
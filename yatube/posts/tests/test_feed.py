@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from posts.feed import feed_for, rebuild_all
+from posts.models import FeedItem, Follow, Post
+
+User = get_user_model()
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.old_post = Post.objects.create(
+            text='Старый пост',
+            author=cls.author,
+        )
+
+    def test_follow_backfills_feed(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertTrue(FeedItem.objects.filter(
+            user=self.follower, post=self.old_post
+        ).exists())
+        self.assertIn(self.old_post, feed_for(self.follower))
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост раскладывается только по лентам подписчиков"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertIn(post, feed_for(self.follower))
+        self.assertNotIn(post, feed_for(self.stranger))
+        self.assertFalse(FeedItem.objects.filter(user=self.stranger).exists())
+
+    def test_unfollow_cleans_feed(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.filter(user=self.follower, author=self.author).delete()
+        self.assertFalse(FeedItem.objects.filter(user=self.follower).exists())
+        self.assertFalse(feed_for(self.follower).exists())
+
+    @mock.patch('posts.constants.FEED_FANOUT_LIMIT', 1)
+    def test_popular_author_posts_are_pulled_on_read(self):
+        """Посты автора с большим числом подписчиков не раскладываются
+        по лентам, но все равно попадают в ленту при чтении"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Пост для всех', author=self.author)
+        self.assertFalse(FeedItem.objects.filter(user=self.follower).exists())
+        feed = feed_for(self.follower)
+        self.assertEqual(list(feed), [post, self.old_post])
+        self.assertFalse(feed_for(self.stranger).exists())
+
+    @mock.patch('posts.constants.FEED_FANOUT_LIMIT', 2)
+    def test_crossing_fanout_limit_keeps_posts_in_feed(self):
+        """Посты, опубликованные выше порога рассылки, остаются в ленте
+        после того, как число подписчиков опустилось ниже порога"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        post = Post.objects.create(text='Пост для всех', author=self.author)
+        self.assertFalse(
+            FeedItem.objects.filter(user=self.follower, post=post).exists()
+        )
+        self.assertEqual(list(feed_for(self.follower)), [post, self.old_post])
+
+        Follow.objects.filter(user=self.stranger).delete()
+        self.assertTrue(
+            FeedItem.objects.filter(user=self.follower, post=post).exists()
+        )
+        self.assertEqual(list(feed_for(self.follower)), [post, self.old_post])
+        self.assertFalse(feed_for(self.stranger).exists())
+
+    def test_rebuild_restores_feeds_in_constant_queries(self):
+        """Пересчет лент не делает запросов на каждую подписку"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        Post.objects.create(text='Новый пост', author=self.author)
+        FeedItem.objects.all().delete()
+        with self.assertNumQueries(2):
+            rebuild_all()
+        for user in (self.follower, self.stranger):
+            self.assertEqual(FeedItem.objects.filter(user=user).count(), 2)
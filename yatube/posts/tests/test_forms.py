@@ -1,13 +1,19 @@
+import os
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from posts import constants
 from posts.models import Group, Post
+from posts.thumbnails import generate_thumbnail
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -118,3 +124,65 @@ class PostFormTest(TestCase):
         self.assertRedirects(response, reverse('login')
                              + '?next=' + reverse('posts:post_create'))
         self.assertEqual(Post.objects.count(), post_count)
+
+    def test_thumbnail_is_generated_for_saved_image(self):
+        """Сохранение картинки ставит в очередь создание миниатюры"""
+        post_data = {
+            'text': 'Пост с миниатюрой',
+            'image': SimpleUploadedFile(
+                name='thumb.gif',
+                content=PostFormTest.image,
+                content_type='image/gif'
+            ),
+        }
+        with mock.patch(
+                'posts.thumbnails.schedule_thumbnail') as schedule:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data=post_data
+            )
+        post = Post.objects.get(text='Пост с миниатюрой')
+        schedule.assert_called_once_with(post.pk)
+        self.assertEqual(post.image_thumbnail, '')
+
+        generate_thumbnail(post.pk)
+        post.refresh_from_db()
+        self.assertTrue(post.image_thumbnail)
+        self.assertTrue(os.path.exists(post.image_thumbnail.path))
+        self.assertEqual(
+            post.image_variants.filter(format='JPEG').count(),
+            len(constants.IMAGE_VARIANT_WIDTHS)
+        )
+        for variant in post.image_variants.all():
+            with self.subTest(variant=variant):
+                self.assertTrue(os.path.exists(variant.image.path))
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, post.image_thumbnail.url)
+
+        post.image = SimpleUploadedFile(
+            name='other.gif',
+            content=PostFormTest.image,
+            content_type='image/gif'
+        )
+        with mock.patch('posts.thumbnails.schedule_thumbnail'):
+            post.save()
+        self.assertFalse(post.image_variants.exists())
+        self.assertEqual(post.image_thumbnail, '')
+
+    def test_backfill_thumbnails_command(self):
+        """Команда backfill_thumbnails создает недостающие миниатюры"""
+        post = Post.objects.create(
+            author=PostFormTest.user,
+            text='Пост без миниатюры',
+            image=SimpleUploadedFile(
+                name='backfill.gif',
+                content=PostFormTest.image,
+                content_type='image/gif'
+            )
+        )
+        call_command('backfill_thumbnails', workers=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(post.image_thumbnail)
@@ -1,7 +1,11 @@
+from unittest import skipUnless
+
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..feed import feed_for
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -52,3 +56,46 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class IndexUsageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index_name}', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_list_views_use_indexes(self):
+        """Запросы страниц-списков идут по индексам без сортировки"""
+        queries = {
+            'post_pub_date_idx': Post.objects.for_list(),
+            'post_group_pub_date_idx': self.group.posts.for_list(),
+            'post_author_pub_date_idx': self.user.post_set.for_list(),
+            'feed_user_pub_date_idx': feed_for(self.follower).for_list(),
+            'comment_post_created_idx': Comment.objects.filter(post_id=1),
+        }
+        for index_name, queryset in queries.items():
+            with self.subTest(index_name=index_name):
+                self.assertUsesIndex(queryset[:10], index_name)
+
+    def test_follow_is_unique(self):
+        """Повторная подписка и подписка на себя запрещены в БД"""
+        for user, author in (
+            (self.follower, self.user),
+            (self.user, self.user),
+        ):
+            with self.subTest(user=user, author=author):
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    Follow.objects.create(user=user, author=author)
@@ -0,0 +1,91 @@
+import datetime as dt
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Post, PostScore
+from posts.popularity import recompute
+
+User = get_user_model()
+
+
+class PopularityTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def score(self, post):
+        return PostScore.objects.get(post=post).value
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий'
+            )
+
+    def test_comments_raise_score_incrementally(self):
+        """Комментарии поднимают пост, пересчет дает тот же результат"""
+        quiet = Post.objects.create(text='Тихий пост', author=self.author)
+        discussed = Post.objects.create(text='Обсуждаемый', author=self.author)
+        self.comment(discussed, 3)
+        self.assertGreater(self.score(discussed), self.score(quiet))
+        incremental = self.score(discussed)
+        recompute()
+        self.assertAlmostEqual(self.score(discussed), incremental)
+
+    def test_old_activity_decays(self):
+        """Старый обсуждаемый пост уступает свежему"""
+        old = Post.objects.create(text='Старый пост', author=self.author)
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - dt.timedelta(days=10)
+        )
+        month_ago = timezone.now() - dt.timedelta(days=10)
+        with mock.patch('django.utils.timezone.now', return_value=month_ago):
+            self.comment(old, 5)
+        fresh = Post.objects.create(text='Свежий пост', author=self.author)
+        recompute()
+        self.assertGreater(self.score(fresh), self.score(old))
+
+    def test_followers_raise_recent_posts(self):
+        """Подписка на автора поднимает его свежие посты"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        before = self.score(post)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertGreater(self.score(post), before)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertAlmostEqual(self.score(post), before)
+
+    def test_popular_page_orders_by_score(self):
+        """Страница популярного выводит посты по убыванию оценки
+        и листается курсором"""
+        quiet = Post.objects.create(text='Тихий пост', author=self.author)
+        discussed = Post.objects.create(text='Обсуждаемый', author=self.author)
+        self.comment(discussed, 2)
+        response = self.client.get(reverse('posts:popular'))
+        self.assertEqual(
+            list(response.context['page_obj']), [discussed, quiet]
+        )
+        with mock.patch('posts.constants.KEYSET_PAGINATION', True), \
+                mock.patch('posts.constants.POST_PER_PAGE', 1):
+            page = self.client.get(reverse('posts:popular')).context[
+                'page_obj'
+            ]
+            self.assertEqual(list(page), [discussed])
+            response = self.client.get(
+                reverse('posts:popular'), {'cursor': page.next_cursor}
+            )
+        self.assertEqual(list(response.context['page_obj']), [quiet])
+
+    def test_recompute_command(self):
+        """Команда пересчета восстанавливает удаленные оценки"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        PostScore.objects.all().delete()
+        call_command('recompute_popularity', stdout=StringIO())
+        self.assertTrue(PostScore.objects.filter(post=post).exists())
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import constants
+from posts.models import Group, Post
+from posts.search import DatabaseSearchBackend, SQLiteFTSBackend
+from posts.utils import encode_cursor
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Поэзия', slug='poetry', description='Стихи'
+        )
+
+    def search(self, query, cursor=None):
+        return SQLiteFTSBackend().search(query, cursor)
+
+    def test_search_ranks_and_matches_all_fields(self):
+        """Поиск находит посты по тексту, группе и автору"""
+        rare = Post.objects.create(
+            text='Про море и горы', author=self.author
+        )
+        often = Post.objects.create(
+            text='Море, море, снова море', author=self.author
+        )
+        grouped = Post.objects.create(
+            text='Стихотворение', author=self.author, group=self.group
+        )
+        self.assertEqual(list(self.search('море')), [often, rare])
+        self.assertEqual(list(self.search('поэзия')), [grouped])
+        self.assertEqual(len(self.search('толстой')), 3)
+        self.assertEqual(len(self.search('')), 0)
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        """Совпадения выделены <mark>, а HTML из текста экранирован"""
+        Post.objects.create(text='<b>море</b> шумит', author=self.author)
+        snippet = self.search('море')[0].snippet
+        self.assertIn('<mark>море</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста"""
+        post = Post.objects.create(text='Старый текст', author=self.author)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(len(self.search('старый')), 0)
+        self.assertEqual(list(self.search('новый')), [post])
+        self.author.first_name = 'Федор'
+        self.author.save()
+        self.assertEqual(list(self.search('федор')), [post])
+        post.delete()
+        self.assertEqual(len(self.search('новый')), 0)
+
+    def test_search_pages_by_cursor(self):
+        """Результаты поиска листаются курсором без повторов"""
+        posts = Post.objects.bulk_create(
+            Post(text=f'Пост про море {number}', author=self.author)
+            for number in range(constants.POST_PER_PAGE + 3)
+        )
+        SQLiteFTSBackend().rebuild()
+        first_page = self.search('море')
+        self.assertTrue(first_page.has_next())
+        second_page = self.search('море', first_page.next_cursor)
+        self.assertFalse(second_page.has_next())
+        found = list(first_page) + list(second_page)
+        self.assertEqual(len(found), len(posts))
+        self.assertEqual(len(set(found)), len(posts))
+
+    def test_broken_cursor_starts_from_first_page(self):
+        """Поврежденный курсор поиска дает первую страницу"""
+        post = Post.objects.create(text='Про море', author=self.author)
+        for values in ([{'x': 1}, [2]], ['1.5', 'abc'], [1], 'море'):
+            with self.subTest(values=values):
+                cursor = encode_cursor(values)
+                self.assertEqual(list(self.search('море', cursor)), [post])
+
+    def test_database_backend_finds_posts(self):
+        """Запасной бэкенд ищет подстроку без полнотекстового индекса"""
+        post = Post.objects.create(text='Про море', author=self.author)
+        page = DatabaseSearchBackend().search('море')
+        self.assertEqual(list(page), [post])
+        self.assertIn('<mark>море</mark>', page[0].snippet)
+
+    def test_search_page_shows_results(self):
+        """Страница поиска показывает найденные посты"""
+        post = Post.objects.create(text='Про море', author=self.author)
+        response = self.client.get(reverse('posts:search'), {'q': 'море'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.assertContains(response, '<mark>море</mark>')
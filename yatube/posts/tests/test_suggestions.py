@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Follow, FollowSuggestion
+from posts.suggestions import candidates, load_graph, rebuild
+
+User = get_user_model()
+
+
+class FollowSuggestionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.friend, cls.twin, cls.star, cls.niche = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'twin', 'star', 'niche')
+        )
+        for user, author in (
+            (cls.reader, cls.friend),
+            (cls.friend, cls.star),
+            (cls.twin, cls.friend),
+            (cls.twin, cls.star),
+            (cls.twin, cls.niche),
+        ):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def test_candidates_from_graph(self):
+        """Рекомендуются друзья друзей и авторы похожих читателей,
+        но не себя и не уже прочитанные"""
+        scores = candidates(self.reader.pk, *load_graph())
+        self.assertEqual(list(scores), [self.star.pk, self.niche.pk])
+        self.assertEqual(scores[self.star.pk][1], 1)
+        self.assertEqual(scores[self.niche.pk][1], 0)
+        self.assertEqual(candidates(self.niche.pk, *load_graph()), {})
+
+    def test_rebuild_replaces_table(self):
+        """Пересчет заменяет старые рекомендации"""
+        FollowSuggestion.objects.create(
+            user=self.reader, author=self.twin, score=100
+        )
+        call_command('compute_suggestions', stdout=StringIO())
+        self.assertEqual(
+            list(self.reader.suggestions.values_list(
+                'author__username', flat=True
+            )),
+            ['star', 'niche']
+        )
+
+    def test_pages_show_suggestions(self):
+        """Рекомендации видны в ленте подписок и в своем профиле"""
+        rebuild()
+        for url in (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', args=[self.reader.username]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    [item.author for item in response.context['suggestions']],
+                    [self.star, self.niche]
+                )
+        response = self.client.get(
+            reverse('posts:profile', args=[self.friend.username])
+        )
+        self.assertFalse(response.context['suggestions'])
+
+    def test_follow_drops_suggestion(self):
+        """Подписка убирает автора из рекомендаций"""
+        rebuild()
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.star.username])
+        )
+        self.assertFalse(self.reader.suggestions.filter(
+            author=self.star
+        ).exists())
@@ -0,0 +1,182 @@
+import datetime as dt
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import AuthorStats, Comment, FeedItem, Follow, Group, Post
+from posts.search import SQLiteFTSBackend
+
+User = get_user_model()
+MODELS = ('groups', 'posts', 'comments', 'follows')
+
+
+class TransferCommandsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.dump_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.pub_date = timezone.now() - dt.timedelta(days=30)
+        for i in range(3):
+            post = Post.objects.create(
+                text=f'Старый пост-{i}',
+                author=cls.author,
+                group=cls.group
+            )
+            Comment.objects.create(
+                post=post, author=cls.reader, text=f'Комментарий-{i}'
+            )
+        Post.objects.update(pub_date=cls.pub_date)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.dump_dir, ignore_errors=True)
+
+    def export(self, data_format):
+        paths = {}
+        for model in MODELS:
+            paths[model] = os.path.join(
+                self.dump_dir, f'{model}.{data_format}'
+            )
+            call_command(
+                'export_data', model, output=paths[model], stdout=StringIO()
+            )
+        return paths
+
+    def load(self, paths):
+        for model in MODELS:
+            call_command('import_data', model, paths[model], stdout=StringIO())
+
+    def wipe(self):
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.exclude(pk=self.reader.pk).delete()
+
+    def test_round_trip_restores_data(self):
+        """Выгрузка и загрузка восстанавливают данные и даты"""
+        for data_format in ('jsonl', 'csv'):
+            with self.subTest(data_format=data_format):
+                paths = self.export(data_format)
+                self.wipe()
+                with mock.patch('posts.constants.TRANSFER_BATCH_SIZE', 2):
+                    self.load(paths)
+                author = User.objects.get(username='author')
+                self.assertFalse(author.has_usable_password())
+                posts = Post.objects.filter(author=author)
+                self.assertEqual(posts.count(), 3)
+                self.assertEqual(
+                    set(posts.values_list('pub_date', flat=True)),
+                    {self.pub_date}
+                )
+                self.assertEqual(
+                    posts.filter(group__slug='test_slug').count(), 3
+                )
+                self.assertEqual(Comment.objects.count(), 3)
+                self.assertTrue(Follow.objects.filter(
+                    user=self.reader, author=author
+                ).exists())
+
+    def test_import_rebuilds_derived_data(self):
+        """После загрузки пересчитаны счетчики, ленты и поиск"""
+        paths = self.export('jsonl')
+        self.wipe()
+        self.load(paths)
+        author = User.objects.get(username='author')
+        self.assertEqual(AuthorStats.objects.get(author=author).post_count, 3)
+        self.assertEqual(FeedItem.objects.filter(user=self.reader).count(), 3)
+        self.assertEqual(
+            set(Post.objects.values_list('comment_count', flat=True)), {1}
+        )
+        self.assertEqual(len(SQLiteFTSBackend().search('старый')), 3)
+
+    def test_repeated_import_does_not_duplicate(self):
+        """Повторная загрузка не создает дублей"""
+        paths = self.export('csv')
+        self.load(paths)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 3)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(Group.objects.count(), 1)
+
+    def test_import_does_not_reuse_source_ids(self):
+        """Посты из выгрузки получают новые id, а комментарии — свои посты"""
+        paths = self.export('jsonl')
+        source_ids = list(Post.objects.values_list('pk', flat=True))
+        self.wipe()
+        local_author = User.objects.create_user(username='local')
+        for pk in source_ids:
+            Post.objects.create(
+                pk=pk, text='Местный пост', author=local_author
+            )
+        self.load(paths)
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertFalse(
+            Comment.objects.filter(post__author=local_author).exists()
+        )
+        for i in range(3):
+            post = Post.objects.get(text=f'Старый пост-{i}')
+            self.assertEqual(
+                list(post.comments.values_list('text', flat=True)),
+                [f'Комментарий-{i}']
+            )
+
+    def test_repeated_import_counts_skipped_rows(self):
+        """Уже загруженные посты и комментарии считаются пропущенными"""
+        paths = self.export('jsonl')
+        for model in ('posts', 'comments'):
+            out = StringIO()
+            call_command('import_data', model, paths[model], stdout=out)
+            self.assertIn('пропущено: 3', out.getvalue())
+
+    def test_sources_keep_their_own_ids(self):
+        """Одинаковые id из разных источников не считаются дублями"""
+        paths = {}
+        for source, author in (('first', 'alice'), ('second', 'bob')):
+            paths[source] = os.path.join(self.dump_dir, f'{source}.jsonl')
+            with open(paths[source], 'w', encoding='utf-8') as stream:
+                stream.write(json.dumps(
+                    {'id': 1, 'text': f'Пост {author}', 'author': author}
+                ) + '\n')
+        for source, path in paths.items():
+            call_command(
+                'import_data', 'posts', path, source=source,
+                stdout=StringIO()
+            )
+        self.assertTrue(Post.objects.filter(author__username='alice').exists())
+        self.assertTrue(Post.objects.filter(author__username='bob').exists())
+        path = os.path.join(self.dump_dir, 'comments.jsonl')
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(json.dumps(
+                {'post': 1, 'author': 'reader', 'text': 'Комментарий'}
+            ) + '\n')
+        call_command(
+            'import_data', 'comments', path, source='second',
+            stdout=StringIO()
+        )
+        self.assertTrue(Comment.objects.filter(
+            post__author__username='bob', text='Комментарий'
+        ).exists())
+
+    def test_export_streams_to_stdout(self):
+        """Без --output выгрузка пишется в стандартный вывод"""
+        out = StringIO()
+        call_command('export_data', 'posts', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        self.assertIn('"author": "author"', out.getvalue())
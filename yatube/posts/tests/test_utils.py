@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+
+from posts.models import Post
+from posts.utils import CursorPage, KeysetPaginator, paginate
+
+User = get_user_model()
+NUMBER_OF_POSTS = 13
+PER_PAGE = 5
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='slava')
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост-{i}', author=cls.user)
+            for i in range(NUMBER_OF_POSTS)
+        )
+        cls.expected = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(Post.objects.all(), PER_PAGE)
+
+    def test_pages_follow_each_other(self):
+        """Курсоры next проходят все посты по порядку и без повторов."""
+        page = self.paginator.get_page()
+        self.assertFalse(page.has_previous())
+        seen = list(page)
+        while page.has_next():
+            page = self.paginator.get_page(page.next_cursor)
+            self.assertTrue(page.has_previous())
+            seen.extend(page)
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор previous возвращает предыдущую страницу."""
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        back = self.paginator.get_page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        back = self.paginator.get_page(back.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_page_is_single_query_without_count_and_offset(self):
+        """Страница загружается одним запросом без COUNT и OFFSET."""
+        first = self.paginator.get_page()
+        with self.assertNumQueries(1) as context:
+            list(self.paginator.get_page(first.next_cursor))
+        sql = context.captured_queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор открывает первую страницу."""
+        for cursor in ('мусор', 'bm90LWpzb24=', 'WyJ4IiwgMSwgMV0='):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(list(page), self.expected[:PER_PAGE])
+
+    def test_paginate_keyset_mode(self):
+        """paginate в режиме keyset отдает CursorPage."""
+        request = RequestFactory().get('/')
+        page = paginate(request, Post.objects.all(), keyset=True)
+        self.assertIsInstance(page, CursorPage)
+        self.assertTrue(page.has_next())
@@ -1,16 +1,22 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.template.loader import render_to_string
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.forms import PostForm
+from posts.groups import get_group
 from posts.models import Comment, Follow, Group, Post
+from posts.utils import CursorPage
 
 User = get_user_model()
 NUMBER_OF_POSTS = 13
@@ -206,6 +212,67 @@ class PostModelTest(TestCase):
                     response.context['page_obj']
                 ), expected_num_posts)
 
+    def test_keyset_paginator(self):
+        """В режиме keyset списки отдают страницы с курсорами"""
+        templates_url_names = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list', kwargs={'slug': PostModelTest.group.slug}
+            ),
+            reverse('posts:profile', args={PostModelTest.user}),
+        ]
+        for reverse_name in templates_url_names:
+            with self.subTest(reverse_name=reverse_name), mock.patch(
+                    'posts.constants.KEYSET_PAGINATION', True):
+                response = self.authorized_client.get(reverse_name)
+                page_obj = response.context['page_obj']
+                self.assertIsInstance(page_obj, CursorPage)
+                self.assertEqual(len(page_obj), 10)
+                self.assertContains(
+                    response, f'?cursor={page_obj.next_cursor}'
+                )
+                response = self.authorized_client.get(
+                    reverse_name, {'cursor': page_obj.next_cursor}
+                )
+                self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_list_pages_query_count_does_not_depend_on_page_size(self):
+        """Число запросов на страницах-списках не зависит от размера
+        страницы: автор и группа не догружаются для каждого поста"""
+        author = User.objects.create_user(username='prolific')
+        group = Group.objects.create(
+            title='Группа без картинок',
+            slug='no_images',
+            description='Посты без изображений',
+        )
+        for i in range(NUMBER_OF_POSTS):
+            Post.objects.create(
+                text=f'Пост без картинки-{i}',
+                author=author,
+                group=group
+            )
+        Follow.objects.create(user=self.follower, author=author)
+        templates_url_names = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            reverse('posts:profile', kwargs={'username': author.username}),
+            reverse('posts:follow_index'),
+        ]
+        for reverse_name in templates_url_names:
+            query_counts = set()
+            for per_page in (2, 10):
+                with self.subTest(reverse_name=reverse_name,
+                                  per_page=per_page), mock.patch(
+                        'posts.constants.POST_PER_PAGE', per_page):
+                    cache.clear()
+                    with CaptureQueriesContext(connection) as context:
+                        response = self.follower_client.get(reverse_name)
+                    self.assertEqual(
+                        len(response.context['page_obj']), per_page
+                    )
+                    query_counts.add(len(context.captured_queries))
+            self.assertEqual(len(query_counts), 1, reverse_name)
+
     def test_post_appears_on_pages(self):
         """Пост отображается на страницах 'index', 'group_list' и 'profile'"""
         response = self.authorized_client.get(reverse('posts:index'))
@@ -259,20 +326,186 @@ class PostModelTest(TestCase):
         self.assertEqual(response.context.get('comments')[0].text,
                          'Новый комментарий')
 
+    def test_comments_are_paginated_newest_first(self):
+        """Комментарии отдаются страницами от новых к старым,
+        следующие страницы приходят фрагментом"""
+        post = PostModelTest.posts[3]
+        for i in range(5):
+            Comment.objects.create(
+                post=post, author=self.follower, text=f'Комментарий-{i}'
+            )
+        with mock.patch('posts.constants.COMMENTS_PER_PAGE', 3):
+            response = self.guest_client.get(
+                reverse('posts:post_detail', args=[post.id])
+            )
+            comments = response.context['comments']
+            self.assertEqual(
+                [comment.text for comment in comments],
+                ['Комментарий-4', 'Комментарий-3', 'Комментарий-2']
+            )
+            self.assertContains(response, 'Комментариев: 5')
+            response = self.guest_client.get(
+                reverse('posts:post_comments', args=[post.id]),
+                {'cursor': comments.next_cursor}
+            )
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий-1', 'Комментарий-0']
+        )
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'Показать еще')
+
     def test_cache_index_page(self):
-        """Кеширование работает верно."""
+        """Кеш страницы сбрасывается сразу после изменения постов."""
         test_post = Post.objects.create(
             text='Этот пост будет удален',
             author=PostModelTest.user,
             group=PostModelTest.group
         )
         check_content = self.guest_client.get(reverse('posts:index')).content
-        test_post.delete()
+        Post.objects.filter(pk=test_post.pk).update(text='Без сигналов')
         cached_content = self.guest_client.get(reverse('posts:index')).content
         self.assertEqual(check_content, cached_content)
-        cache.clear()
-        cleared_cache = self.guest_client.get(reverse('posts:index')).content
-        self.assertNotEqual(cached_content, cleared_cache)
+        test_post.delete()
+        fresh_content = self.guest_client.get(reverse('posts:index')).content
+        self.assertNotEqual(cached_content, fresh_content)
+        self.assertNotIn(test_post.text.encode(), fresh_content)
+
+    def test_cached_pages_show_edited_post(self):
+        """Отредактированный пост сразу виден на закешированных страницах"""
+        post = PostModelTest.posts[0]
+        urls = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list', kwargs={'slug': PostModelTest.group.slug}
+            ),
+            reverse(
+                'posts:profile', kwargs={'username': PostModelTest.user}
+            ),
+        ]
+        for client in (self.guest_client, self.authorized_client):
+            for url in urls:
+                client.get(url)
+        post.text = 'Отредактированный текст'
+        post.save()
+        for client in (self.guest_client, self.authorized_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertContains(client.get(url), post.text)
+
+    def test_post_pages_answer_conditional_requests(self):
+        """Неизмененные страницы отдают 304 без рендеринга шаблона"""
+        post = PostModelTest.posts[4]
+        urls = [
+            reverse('posts:post_detail', args=[post.id]),
+            reverse('posts:group_list', args=[PostModelTest.group.slug]),
+            reverse('posts:profile', args=[PostModelTest.user.username]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                etag = response['ETag']
+                self.assertIn('public', response['Cache-Control'])
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('private', response['Cache-Control'])
+        etag = self.guest_client.get(urls[0])['ETag']
+        Comment.objects.create(
+            post=post, author=self.follower, text='Комментарий'
+        )
+        response = self.guest_client.get(urls[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_cards_are_rendered_once_per_version(self):
+        """Карточки постов рендерятся заново только после изменения"""
+        url = reverse('posts:index')
+        with mock.patch(
+            'posts.templatetags.post_cards.render_to_string',
+            wraps=render_to_string
+        ) as render:
+            self.authorized_client.get(url)
+            self.assertEqual(render.call_count, 10)
+            self.authorized_client.get(url)
+            self.assertEqual(render.call_count, 10)
+            post = Post.objects.latest('pub_date')
+            post.text = 'Измененный текст'
+            post.save()
+            response = self.authorized_client.get(url)
+            self.assertEqual(render.call_count, 11)
+        self.assertContains(response, 'Измененный текст')
+
+    def test_post_cards_follow_author_rename(self):
+        """После смены логина карточки ссылаются на новый профиль"""
+        author = User.objects.create_user(username='before')
+        Post.objects.create(text='Пост', author=author)
+        url = reverse('posts:profile', args=['before'])
+        self.guest_client.get(url)
+        author.username = 'renamed'
+        author.save()
+        response = self.guest_client.get(
+            reverse('posts:profile', args=['renamed'])
+        )
+        self.assertContains(
+            response, reverse('posts:profile', args=['renamed'])
+        )
+        self.assertNotContains(response, url)
+
+    def test_group_index_shows_precomputed_stats(self):
+        """Страница групп показывает число постов и последнюю активность
+        без подсчета по таблице постов"""
+        group = Group.objects.create(
+            title='Активная группа', slug='active', description='Описание'
+        )
+        post = Post.objects.create(text='Пост', author=self.user, group=group)
+        with CaptureQueriesContext(connection) as context:
+            response = self.guest_client.get(reverse('posts:groups'))
+        groups = response.context['groups']
+        self.assertEqual(groups[0]['group'], group)
+        self.assertEqual(groups[0]['post_count'], 1)
+        self.assertEqual(groups[0]['last_post_at'], post.pub_date)
+        self.assertFalse(any(
+            'posts_post' in query['sql']
+            for query in context.captured_queries
+        ))
+
+    def test_group_index_follows_post_leaving_group(self):
+        """Страница групп обновляется, когда пост убирают из группы"""
+        group = Group.objects.create(
+            title='Покинутая группа', slug='left', description='Описание'
+        )
+        post = Post.objects.create(text='Пост', author=self.user, group=group)
+        url = reverse('posts:groups')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['groups'][0]['post_count'], 1)
+        post.group = None
+        post.save()
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['groups'][0]['post_count'], 0)
+
+    def test_group_registry_is_invalidated_on_save(self):
+        """Реестр групп отдается без базы и сбрасывается при изменении"""
+        group = Group.objects.create(
+            title='Группа реестра', slug='registry', description='Описание'
+        )
+        self.assertEqual(get_group('registry'), group)
+        with self.assertNumQueries(0):
+            get_group('registry')
+        group.slug = 'renamed'
+        group.save()
+        self.assertIsNone(get_group('registry'))
+        self.assertEqual(get_group('renamed'), group)
+        response = self.guest_client.get(
+            reverse('posts:group_list', args=['registry'])
+        )
+        self.assertEqual(response.status_code, 404)
 
     def test_authorized_client_can_follow_author(self):
         """Авторизованный пользователь может подписаться на автора"""
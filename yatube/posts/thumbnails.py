@@ -0,0 +1,103 @@
+import logging
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, features
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+
+from posts import constants
+from tasks.queue import enqueue
+
+from .caching import bump_generations, post_scopes
+from .models import Post, PostImageVariant
+
+logger = logging.getLogger(__name__)
+
+
+def supported_formats():
+    """Форматы вариантов, которые умеют и Pillow, и sorl-thumbnail."""
+    return [
+        image_format for image_format in constants.IMAGE_VARIANT_FORMATS
+        if image_format in EXTENSIONS and (
+            image_format == 'JPEG'
+            or features.check(image_format.lower())
+            or f'.{image_format.lower()}' in Image.registered_extensions()
+        )
+    ]
+
+
+def variant_geometry(width):
+    base_width, base_height = map(
+        int, constants.THUMBNAIL_GEOMETRY.split('x')
+    )
+    return width, round(width * base_height / base_width)
+
+
+def generate_variants(post):
+    variants = []
+    for image_format in supported_formats():
+        for width in constants.IMAGE_VARIANT_WIDTHS:
+            width, height = variant_geometry(width)
+            thumbnail = get_thumbnail(
+                post.image,
+                f'{width}x{height}',
+                format=image_format,
+                **constants.THUMBNAIL_OPTIONS
+            )
+            variants.append(PostImageVariant(
+                post_id=post.pk,
+                image=thumbnail.name,
+                format=image_format,
+                width=width,
+                height=height,
+            ))
+    return variants
+
+
+def generate_thumbnail(post_id):
+    """Создает миниатюру и набор вариантов картинки по ширине и формату.
+
+    Если картинку успели заменить, результат не записывается:
+    за новой картинкой уже поставлена своя задача.
+    """
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    if post is None or not post.image:
+        return None
+    thumbnail = get_thumbnail(
+        post.image,
+        constants.THUMBNAIL_GEOMETRY,
+        **constants.THUMBNAIL_OPTIONS
+    )
+    variants = generate_variants(post)
+    with transaction.atomic():
+        updated = Post.objects.filter(
+            pk=post_id,
+            image=post.image.name
+        ).update(image_thumbnail=thumbnail.name, updated=timezone.now())
+        if updated:
+            post.image_variants.all().delete()
+            PostImageVariant.objects.bulk_create(variants)
+    if updated:
+        bump_generations(*post_scopes(post))
+    return thumbnail.name
+
+
+def generate_or_log(post_id):
+    try:
+        return generate_thumbnail(post_id)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру поста %s', post_id)
+
+
+def run_in_background(post_id):
+    try:
+        return generate_or_log(post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_thumbnail(post_id):
+    enqueue('posts.generate_thumbnail', post_id, key=f'thumbnail:{post_id}')
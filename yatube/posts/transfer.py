@@ -0,0 +1,331 @@
+import csv
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import constants
+
+from . import caching, counters, feed, popularity, search, suggestions
+from .models import Comment, Follow, Group, ImportedPost, Post, User
+
+FORMATS = ('jsonl', 'csv')
+
+# Колонка выгрузки -> поле модели для values_list.
+COLUMNS = {
+    'groups': (Group, {
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    }),
+    'posts': (Post, {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+    }),
+    'comments': (Comment, {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+    'follows': (Follow, {
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+MODELS = tuple(COLUMNS)
+
+
+def format_for(path, default='jsonl'):
+    if path and path.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def export_rows(model_name):
+    """Строки выгрузки: читаются из базы порциями, а не целиком."""
+    model, columns = COLUMNS[model_name]
+    rows = model.objects.order_by('pk').values_list(
+        *columns.values()
+    ).iterator(chunk_size=constants.EXPORT_CHUNK_SIZE)
+    for values in rows:
+        yield {
+            column: value.isoformat() if hasattr(value, 'isoformat')
+            else value
+            for column, value in zip(columns, values)
+        }
+
+
+def write_rows(model_name, rows, stream, data_format):
+    if data_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=list(
+            COLUMNS[model_name][1]
+        ))
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def read_rows(stream, data_format):
+    if data_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+@contextmanager
+def keep_auto_now_add(*models):
+    """Отключает auto_now_add, чтобы сохранить даты из выгрузки."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def date_or_now(value):
+    return parse_datetime(value) if value else timezone.now()
+
+
+def allocate_ids(model, objects):
+    """Проставляет объектам id после наибольшего в таблице.
+
+    Нужно, если база не возвращает id из bulk_create. Параллельная
+    вставка в тот же диапазон упадет на первичном ключе, а не
+    перепишет чужие строки.
+    """
+    last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    for pk, instance in enumerate(objects, last + 1):
+        instance.pk = pk
+
+
+class Importer:
+    """Загружает строки пачками через bulk_create.
+
+    Авторы и группы ищутся по заранее построенным словарям, недостающие
+    авторы создаются без пароля. Посты получают новые id, а id из
+    выгрузки запоминаются в ImportedPost вместе с источником: по ним
+    комментарии находят свои посты, а выгрузки разных источников
+    с одинаковыми id не мешают друг другу. Посты и комментарии,
+    которые уже есть в базе, пропускаются, поэтому повторный импорт
+    не создает дублей.
+    """
+
+    def __init__(self, source=''):
+        self.source = source
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.scopes = {caching.index_scope()}
+        self.skipped = 0
+
+    def resolve_users(self, usernames):
+        missing = {name for name in usernames if name not in self.users}
+        if missing:
+            users = [User(username=name) for name in missing]
+            for user in users:
+                user.set_unusable_password()
+            User.objects.bulk_create(users, ignore_conflicts=True)
+            self.users.update(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'pk'))
+        return self.users
+
+    def build_groups(self, rows):
+        return [
+            Group(
+                title=row['title'],
+                slug=row['slug'],
+                description=row.get('description') or ''
+            )
+            for row in rows
+        ]
+
+    def build_posts(self, rows):
+        users = self.resolve_users(row['author'] for row in rows)
+        source_ids = [int(row['id']) for row in rows if row.get('id')]
+        imported = set(ImportedPost.objects.filter(
+            source=self.source, source_id__in=source_ids
+        ).values_list('source_id', flat=True))
+        posts = []
+        for row in rows:
+            source_id = int(row['id']) if row.get('id') else None
+            if source_id is not None:
+                if source_id in imported:
+                    self.skipped += 1
+                    continue
+                imported.add(source_id)
+            self.scopes.add(caching.profile_scope(row['author']))
+            if row.get('group'):
+                self.scopes.add(caching.group_scope(row['group']))
+            post = Post(
+                text=row['text'],
+                pub_date=date_or_now(row.get('pub_date')),
+                author_id=users[row['author']],
+                group_id=self.groups.get(row.get('group')),
+                image=row.get('image') or '',
+            )
+            post.source_id = source_id
+            posts.append(post)
+        return posts
+
+    def save_posts(self, posts):
+        """Вставляет новые посты и связывает их с id из выгрузки.
+
+        Пост с тем же автором, датой и текстом уже есть в базе: он
+        не вставляется повторно, а связывается с id из выгрузки.
+        """
+        existing = {
+            (author_id, pub_date, text): pk
+            for author_id, pub_date, text, pk in Post.objects.filter(
+                author_id__in={post.author_id for post in posts},
+                pub_date__in={post.pub_date for post in posts},
+            ).values_list('author_id', 'pub_date', 'text', 'pk')
+        }
+        new_posts = {}
+        duplicates = []
+        for post in posts:
+            key = (post.author_id, post.pub_date, post.text)
+            if key in existing or key in new_posts:
+                duplicates.append((post, key))
+                self.skipped += 1
+            else:
+                new_posts[key] = post
+        if not connection.features.can_return_ids_from_bulk_insert:
+            allocate_ids(Post, new_posts.values())
+        Post.objects.bulk_create(new_posts.values())
+        for post, key in duplicates:
+            post.pk = existing[key] if key in existing else new_posts[key].pk
+        ImportedPost.objects.bulk_create(
+            ImportedPost(
+                source=self.source, source_id=post.source_id, post_id=post.pk
+            )
+            for post in posts if post.source_id is not None
+        )
+
+    def build_comments(self, rows):
+        users = self.resolve_users(row['author'] for row in rows)
+        post_ids = dict(ImportedPost.objects.filter(
+            source=self.source,
+            source_id__in=[int(row['post']) for row in rows]
+        ).values_list('source_id', 'post_id'))
+        comments = []
+        for row in rows:
+            post_id = post_ids.get(int(row['post']))
+            if post_id is None:
+                self.skipped += 1
+                continue
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=users[row['author']],
+                text=row['text'],
+                created=date_or_now(row.get('created')),
+            ))
+        comments = self.new_comments(comments)
+        # Области постов не копятся до конца импорта: их больше,
+        # чем авторов и групп.
+        caching.bump_generations(
+            *(caching.post_scope(comment.post_id) for comment in comments)
+        )
+        return comments
+
+    def new_comments(self, comments):
+        """Комментарии, которых еще нет в базе и в этой пачке."""
+        seen = set(Comment.objects.filter(
+            post_id__in={comment.post_id for comment in comments},
+            created__in={comment.created for comment in comments},
+        ).values_list('post_id', 'author_id', 'created', 'text'))
+        new_comments = []
+        for comment in comments:
+            key = (
+                comment.post_id, comment.author_id, comment.created,
+                comment.text
+            )
+            if key in seen:
+                self.skipped += 1
+                continue
+            seen.add(key)
+            new_comments.append(comment)
+        return new_comments
+
+    def build_follows(self, rows):
+        users = self.resolve_users(
+            name for row in rows for name in (row['user'], row['author'])
+        )
+        follows = []
+        for row in rows:
+            if row['user'] == row['author']:
+                self.skipped += 1
+                continue
+            self.scopes.add(caching.profile_scope(row['user']))
+            self.scopes.add(caching.profile_scope(row['author']))
+            follows.append(Follow(
+                user_id=users[row['user']],
+                author_id=users[row['author']],
+            ))
+        return follows
+
+    def run(self, model_name, rows):
+        """Импортирует строки и возвращает число прочитанных."""
+        model = COLUMNS[model_name][0]
+        build = getattr(self, f'build_{model_name}')
+        rows = iter(rows)
+        total = 0
+        with keep_auto_now_add(model):
+            while True:
+                batch = list(islice(rows, constants.TRANSFER_BATCH_SIZE))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    objects = build(batch)
+                    if model is Post:
+                        self.save_posts(objects)
+                    else:
+                        model.objects.bulk_create(
+                            objects, ignore_conflicts=True
+                        )
+                total += len(batch)
+        if model is Group:
+            self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        reset_sequences(model)
+        return total
+
+
+def reset_sequences(*models):
+    """Сдвигает счетчики id после вставки строк с явными id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def rebuild_derived(scopes):
+    """Пересчитывает то, что bulk_create обходит вместе с сигналами."""
+    counters.rebuild_all()
+    counters.rebuild_comment_counts()
+    counters.rebuild_groups()
+    popularity.recompute()
+    feed.rebuild_all()
+    suggestions.rebuild()
+    search.get_backend().rebuild()
+    caching.bump_generations(*scopes)
@@ -1,9 +1,159 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db.models import Q
 
 from posts import constants
 
 
-def paginate(request, post_list):
+def encode_cursor(values):
+    payload = json.dumps(values)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Значения курсора или None, если курсор поврежден."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, TypeError, ValueError, UnicodeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class CursorPage:
+    """Страница keyset-пагинации.
+
+    Повторяет ту часть интерфейса `Page`, которую используют шаблоны,
+    но вместо номеров страниц отдает непрозрачные курсоры.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage: {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Пагинация по ключу (field, pk) от новых записей к старым.
+
+    Каждая страница — один запрос с LIMIT, без COUNT(*) и OFFSET.
+    """
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(self, object_list, per_page, field='pub_date'):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.field = field
+
+    def encode_cursor(self, direction, obj):
+        value = getattr(obj, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        return encode_cursor([direction, value, obj.pk])
+
+    def model_field(self):
+        annotation = self.object_list.query.annotations.get(self.field)
+        if annotation is not None:
+            return annotation.output_field
+        return self.object_list.model._meta.get_field(self.field)
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, value, pk = decode_cursor(cursor)
+            value = self.model_field().to_python(value)
+            pk = int(pk)
+        except (TypeError, ValueError, ValidationError):
+            return None
+        if direction not in (self.NEXT, self.PREVIOUS) or value is None:
+            return None
+        return direction, value, pk
+
+    def get_page(self, cursor=None):
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self._page_after(None)
+        direction, value, pk = position
+        if direction == self.PREVIOUS:
+            return self._page_before(value, pk)
+        return self._page_after((value, pk))
+
+    def _page_after(self, position):
+        queryset = self.object_list.order_by(f'-{self.field}', '-pk')
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__lt': value})
+                | Q(**{self.field: value, 'pk__lt': pk})
+            )
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return self._build_page(
+            rows,
+            has_next=has_next,
+            has_previous=position is not None and bool(rows),
+        )
+
+    def _page_before(self, value, pk):
+        queryset = self.object_list.order_by(self.field, 'pk').filter(
+            Q(**{f'{self.field}__gt': value})
+            | Q(**{self.field: value, 'pk__gt': pk})
+        )
+        rows = list(queryset[:self.per_page + 1])
+        if len(rows) <= self.per_page:
+            return self._page_after(None)
+        rows = rows[:self.per_page][::-1]
+        return self._build_page(rows, has_next=True, has_previous=True)
+
+    def _build_page(self, rows, has_next, has_previous):
+        next_cursor = previous_cursor = None
+        if has_next:
+            next_cursor = self.encode_cursor(self.NEXT, rows[-1])
+        if has_previous:
+            previous_cursor = self.encode_cursor(self.PREVIOUS, rows[0])
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+def loaded(page):
+    """Загружает объекты страницы сразу, а не при рендеринге шаблона."""
+    list(page)
+    return page
+
+
+def paginate(request, post_list, keyset=None, field='pub_date'):
+    if keyset is None:
+        keyset = constants.KEYSET_PAGINATION
+    if keyset:
+        paginator = KeysetPaginator(
+            post_list, constants.POST_PER_PAGE, field=field
+        )
+        return paginator.get_page(request.GET.get('cursor'))
     paginator = Paginator(post_list, constants.POST_PER_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
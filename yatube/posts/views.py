@@ -1,26 +1,52 @@
 from django.contrib.auth.decorators import login_required
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from core.concurrency import gather
 from posts import constants
 
+from .caching import (cache_page_by_generation, conditional_page,
+                      group_scope, groups_scope, index_scope,
+                      post_page_scopes, profile_page_scopes,
+                      profile_scope)
+from .counters import get_stats
+from .feed import feed_for
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import paginate
+from .groups import all_groups, get_group_or_404
+from .models import Comment, Follow, GroupStats, Post, User
+from .search import get_backend
+from .suggestions import suggestions_for
+from .utils import KeysetPaginator, loaded, paginate
 
 
-@cache_page(constants.INDEX_CACHE, key_prefix='index_page')
+@cache_page_by_generation(index_scope)
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_list()
     context = {
         'page_obj': paginate(request, post_list),
     }
     return render(request, 'posts/index.html', context)
 
 
+def popular(request):
+    post_list = Post.objects.for_list().filter(
+        score__isnull=False
+    ).annotate(
+        popularity=F('score__value')
+    ).order_by('-popularity', '-pk')
+    context = {
+        'page_obj': paginate(request, post_list, field='popularity'),
+        'popular': True,
+    }
+    return render(request, 'posts/popular.html', context)
+
+
+@conditional_page(group_scope)
+@cache_page_by_generation(group_scope)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    group = get_group_or_404(slug)
+    post_list = group.posts.for_list()
     context = {
         'group': group,
         'posts': post_list,
@@ -29,29 +55,79 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_page_by_generation(groups_scope)
+def group_index(request):
+    stats = {
+        group_stats.pk: group_stats
+        for group_stats in GroupStats.objects.all()
+    }
+    groups = []
+    for group in all_groups():
+        group_stats = stats.get(group.pk)
+        groups.append({
+            'group': group,
+            'post_count': group_stats.post_count if group_stats else 0,
+            'last_post_at': group_stats.last_post_at if group_stats else None,
+        })
+    # Сначала самые активные группы, группы без постов в конце.
+    groups.sort(
+        key=lambda item: (
+            item['last_post_at'] is not None, item['last_post_at'] or 0
+        ),
+        reverse=True
+    )
+    return render(request, 'posts/groups.html', {'groups': groups})
+
+
+@conditional_page(profile_page_scopes)
+@cache_page_by_generation(profile_scope)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.post_set.all()
-    post_count = post_list.count()
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(user=request.user,
-                                          author=author).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    stats = get_stats(author)
+    post_list = author.post_set.for_list()
+    user = request.user
+    follow = Follow.objects.filter(user_id=user.pk, author=author)
+    page_obj, following, suggestions = gather(
+        lambda: loaded(paginate(request, post_list)),
+        lambda: user.is_authenticated and follow.exists(),
+        lambda: list(suggestions_for(user)) if user == author else [],
+    )
     context = {
         'author': author,
-        'page_obj': paginate(request, post_list),
+        'page_obj': page_obj,
         'posts': post_list,
-        'post_count': post_count,
+        'post_count': stats.post_count,
+        'stats': stats,
         'following': following,
+        'suggestions': suggestions,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def comments_page(request, post_id):
+    paginator = KeysetPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        constants.COMMENTS_PER_PAGE,
+        field='created'
+    )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@conditional_page(post_page_scopes)
 def post_detail(request, post_id):
-    full_post = get_object_or_404(Post, id=post_id)
-    author_posts = Post.objects.filter(author=full_post.author)
-    post_count = author_posts.count()
-    comments = full_post.comments.select_related('author')
+    full_post, comments = gather(
+        lambda: get_object_or_404(
+            Post.objects.select_related(
+                'author__stats', 'group'
+            ).prefetch_related('image_variants'),
+            id=post_id
+        ),
+        lambda: loaded(comments_page(request, post_id)),
+    )
+    post_count = get_stats(full_post.author).post_count
     form = CommentForm()
     context = {
         'full_post': full_post,
@@ -62,6 +138,28 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев фрагментом HTML."""
+    post = get_object_or_404(Post.objects.only('pk'), id=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(request, post.pk),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = get_backend().search(query, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     if request.method != 'POST':
@@ -116,9 +214,14 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = feed_for(request.user).for_list()
+    page_obj, suggestions = gather(
+        lambda: loaded(paginate(request, post_list)),
+        lambda: list(suggestions_for(request.user)),
+    )
     context = {
-        'page_obj': paginate(request, post_list)
+        'page_obj': page_obj,
+        'suggestions': suggestions,
     }
     return render(request, 'posts/follow.html', context)
 
@@ -126,9 +229,12 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if author != request.user and not Follow.objects.filter(
-            user=request.user, author=author).exists():
-        Follow.objects.create(user=request.user, author=author)
+    if author != request.user:
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user=request.user, author=author)
+        except IntegrityError:
+            pass
     return redirect('posts:profile', username)
 
 
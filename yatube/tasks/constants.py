@@ -0,0 +1,7 @@
+TASK_RETRIES = 3
+TASK_RETRY_DELAY = 10
+TASK_BATCH_SIZE = 50
+TASK_POLL_INTERVAL = 1
+TASK_LEASE = 60 * 10
+TASK_KEEP_HOURS = 24
+LOCAL_WORKERS = 2
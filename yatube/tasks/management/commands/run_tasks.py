@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks import constants
+from tasks.queue import get_broker
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи из очереди в базе данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и завершиться'
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=constants.TASK_BATCH_SIZE,
+            help='Сколько задач забирать за раз'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=constants.TASK_POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста'
+        )
+
+    def handle(self, *args, **options):
+        broker = get_broker('database')
+        total = 0
+        while True:
+            done = broker.run_pending(options['batch'])
+            total += done
+            if done:
+                continue
+            broker.purge()
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Выполнено задач: {total}')
+        )
@@ -0,0 +1,245 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (IntegrityError, close_old_connections, connection,
+                       transaction)
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.metrics import Collector, activate, deactivate, registry
+from tasks import constants
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+_tasks = {}
+_brokers = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, retries):
+        self.func = func
+        self.name = name
+        self.retries = retries
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def delay(self, *args, key=None):
+        enqueue(self.name, *args, key=key)
+
+
+def task(name, retries=constants.TASK_RETRIES):
+    """Регистрирует функцию как задачу; аргументы — значения JSON."""
+    def decorator(func):
+        _tasks[name] = TaskFunction(func, name, retries)
+        return _tasks[name]
+    return decorator
+
+
+def get_task(name):
+    return _tasks[name]
+
+
+def retry_delay(attempt):
+    return timedelta(seconds=constants.TASK_RETRY_DELAY * 2 ** (attempt - 1))
+
+
+def execute(name, args):
+    """Выполняет задачу один раз, записывая время и SQL в метрики."""
+    collector = Collector()
+    token = activate(collector)
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(collector):
+            return get_task(name).func(*args)
+    finally:
+        deactivate(token)
+        registry.record(
+            f'task:{name}', time.perf_counter() - started, collector
+        )
+
+
+def run_with_retries(name, args, wait=False, atomic=False):
+    """Повторяет упавшую задачу до исчерпания попыток; ошибка
+    последней попытки пишется в лог, а не пробрасывается."""
+    retries = get_task(name).retries
+    for attempt in range(1, retries + 2):
+        try:
+            if not atomic:
+                return execute(name, args)
+            with transaction.atomic():
+                return execute(name, args)
+        except Exception:
+            if attempt > retries:
+                logger.exception('Задача %s%s не выполнена', name, args)
+                return None
+            logger.warning(
+                'Задача %s%s упала, попытка %s', name, args, attempt
+            )
+            if wait:
+                time.sleep(retry_delay(attempt).total_seconds())
+
+
+class ImmediateBroker:
+    """Выполняет задачу сразу в текущем потоке: для разработки и тестов.
+
+    Каждая попытка идет в своей точке сохранения, чтобы ошибка задачи
+    не ломала транзакцию запроса.
+    """
+
+    def enqueue(self, name, args, key):
+        run_with_retries(name, args, atomic=True)
+
+
+class LocalBroker:
+    """Пул потоков текущего процесса; задачи теряются при перезапуске."""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = set()
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=constants.LOCAL_WORKERS,
+                    thread_name_prefix='tasks'
+                )
+            return self._executor
+
+    def enqueue(self, name, args, key):
+        transaction.on_commit(lambda: self.submit(name, args, key))
+
+    def submit(self, name, args, key):
+        if key is not None:
+            with self._lock:
+                if key in self._pending:
+                    return
+                self._pending.add(key)
+        self.get_executor().submit(self.run, name, args, key)
+
+    def run(self, name, args, key):
+        if key is not None:
+            with self._lock:
+                self._pending.discard(key)
+        try:
+            run_with_retries(name, args, wait=True)
+        finally:
+            close_old_connections()
+
+
+class DatabaseBroker:
+    """Задачи пишутся в таблицу в транзакции вместе с данными
+    и выполняются командой run_tasks."""
+
+    def enqueue(self, name, args, key):
+        if key is not None and Task.objects.filter(
+            key=key, status=Task.PENDING
+        ).exists():
+            return
+        try:
+            with transaction.atomic():
+                Task.objects.create(name=name, args=json.dumps(args), key=key)
+        except IntegrityError:
+            # Такую же задачу параллельно поставил другой запрос.
+            pass
+
+    def due(self, now):
+        return Q(status=Task.PENDING, run_at__lte=now) | Q(
+            status=Task.RUNNING,
+            started__lt=now - timedelta(seconds=constants.TASK_LEASE)
+        )
+
+    def claim(self, limit):
+        """Забирает готовые задачи условным UPDATE: одну задачу
+        получает только один воркер. Зависшие дольше аренды
+        выполняющиеся задачи забираются повторно."""
+        now = timezone.now()
+        candidates = list(Task.objects.filter(self.due(now)).order_by(
+            'run_at'
+        ).values_list('pk', flat=True)[:limit])
+        claimed = [
+            pk for pk in candidates
+            if Task.objects.filter(self.due(now), pk=pk).update(
+                status=Task.RUNNING,
+                started=now,
+                attempts=F('attempts') + 1
+            )
+        ]
+        return list(Task.objects.filter(pk__in=claimed).order_by('run_at'))
+
+    def run(self, task):
+        """Попытка идет в транзакции: упавшая задача не оставляет
+        половины своих изменений, а успешная фиксируется вместе
+        с отметкой о выполнении."""
+        try:
+            with transaction.atomic():
+                execute(task.name, task.arguments)
+                task.status = Task.DONE
+                task.finished = timezone.now()
+                task.save(update_fields=['status', 'finished'])
+        except Exception as error:
+            self.fail(task, error)
+
+    def fail(self, task, error):
+        task.error = repr(error)
+        retries = _tasks[task.name].retries if task.name in _tasks else 0
+        if task.attempts > retries:
+            logger.exception('Задача %s не выполнена', task)
+            task.status = Task.FAILED
+            task.finished = timezone.now()
+            task.save(update_fields=['status', 'finished', 'error'])
+            return
+        logger.warning('Задача %s упала, попытка %s', task, task.attempts)
+        task.status = Task.PENDING
+        task.run_at = timezone.now() + retry_delay(task.attempts)
+        try:
+            with transaction.atomic():
+                task.save(update_fields=['status', 'run_at', 'error'])
+        except IntegrityError:
+            # Пока задача выполнялась, поставили такую же: хватит ее.
+            task.delete()
+
+    def run_pending(self, limit=constants.TASK_BATCH_SIZE):
+        tasks = self.claim(limit)
+        for task in tasks:
+            self.run(task)
+        return len(tasks)
+
+    def purge(self):
+        return Task.objects.filter(
+            status=Task.DONE,
+            finished__lt=timezone.now() - timedelta(
+                hours=constants.TASK_KEEP_HOURS
+            )
+        ).delete()[0]
+
+
+BROKERS = {
+    'immediate': ImmediateBroker,
+    'local': LocalBroker,
+    'database': DatabaseBroker,
+}
+
+
+def get_broker(name=None):
+    name = name or settings.TASKS_BROKER
+    if name not in _brokers:
+        _brokers[name] = BROKERS[name]()
+    return _brokers[name]
+
+
+def enqueue(name, *args, key=None):
+    """Ставит задачу в очередь выбранного брокера.
+
+    Задачи с одинаковым ключом, еще не начатые, выполняются один раз.
+    """
+    get_task(name)
+    get_broker().enqueue(name, list(args), key)
@@ -0,0 +1,132 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.metrics import registry
+from posts.models import FeedItem, Follow, Post
+from tasks.models import Task
+from tasks.queue import enqueue, get_broker, task
+
+User = get_user_model()
+calls = []
+
+
+@task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('tests.flaky', retries=1)
+def flaky(value):
+    calls.append(value)
+    if len(calls) < 2:
+        raise RuntimeError('Сбой')
+
+
+@task('tests.broken', retries=1)
+def broken():
+    raise RuntimeError('Сбой')
+
+
+@task('tests.partial', retries=0)
+def partial(username):
+    User.objects.create_user(username=username)
+    raise RuntimeError('Сбой')
+
+
+class ImmediateBrokerTest(TestCase):
+    def setUp(self):
+        calls.clear()
+        registry.reset()
+
+    def test_task_runs_with_retries_and_metrics(self):
+        """Задача выполняется сразу, повторяется после сбоя
+        и попадает в метрики"""
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            flaky.delay('x')
+        self.assertEqual(calls, ['x', 'x'])
+        stats = registry.snapshot()['task:tests.flaky']
+        self.assertEqual(stats['requests'], 2)
+
+    def test_failed_task_does_not_break_request(self):
+        """Ошибка задачи пишется в лог и не ломает транзакцию"""
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            broken.delay()
+        self.assertEqual(User.objects.count(), 0)
+
+
+@override_settings(TASKS_BROKER='database')
+class DatabaseBrokerTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_worker(self):
+        call_command('run_tasks', once=True, stdout=StringIO())
+
+    def test_idempotency_key(self):
+        """Задачи с одинаковым ключом до выполнения ставятся один раз"""
+        enqueue('tests.record', 1, key='same')
+        enqueue('tests.record', 2, key='same')
+        enqueue('tests.record', 3)
+        self.assertEqual(Task.objects.count(), 2)
+        self.run_worker()
+        self.assertEqual(sorted(calls), [1, 3])
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
+        enqueue('tests.record', 4, key='same')
+        self.assertEqual(Task.objects.filter(key='same').count(), 2)
+
+    def test_retry_with_backoff_then_fail(self):
+        """Упавшая задача откладывается, а после всех попыток
+        помечается невыполненной"""
+        enqueue('tests.broken')
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            self.run_worker()
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, Task.PENDING)
+        self.assertEqual(failed.attempts, 1)
+        self.assertGreater(failed.run_at, timezone.now())
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.run_worker()
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, Task.FAILED)
+        self.assertIn('Сбой', failed.error)
+
+    def test_failed_attempt_is_rolled_back(self):
+        """Изменения упавшей попытки откатываются"""
+        enqueue('tests.partial', 'ghost')
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.run_worker()
+        self.assertFalse(User.objects.filter(username='ghost').exists())
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_stale_running_task_is_reclaimed(self):
+        """Задачу упавшего воркера забирают после истечения аренды"""
+        Task.objects.create(
+            name='tests.record',
+            args='[5]',
+            status=Task.RUNNING,
+            started=timezone.now() - timedelta(days=1)
+        )
+        self.assertEqual(get_broker('database').run_pending(), 1)
+        self.assertEqual(calls, [5])
+
+    def test_post_side_effects_are_queued(self):
+        """Сохранение поста ставит раскладку по лентам в очередь"""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        self.run_worker()
+        post = Post.objects.create(text='Пост', author=author)
+        self.assertTrue(Task.objects.filter(
+            name='posts.fan_out_post', status=Task.PENDING
+        ).exists())
+        self.assertFalse(FeedItem.objects.exists())
+        self.run_worker()
+        self.assertTrue(
+            FeedItem.objects.filter(user=reader, post=post).exists()
+        )
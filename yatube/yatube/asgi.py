@@ -0,0 +1,16 @@
+"""ASGI-точка входа: uvicorn yatube.asgi:application.
+
+Django 2.2 не поддерживает ASGI и асинхронные вью, поэтому запросы
+выполняет WSGI-обработчик через asgiref.wsgi.WsgiToAsgi, не больше
+ASGI_THREADS одновременно.
+"""
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WsgiBridge
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WsgiBridge(get_wsgi_application(), settings.ASGI_THREADS)
@@ -1,10 +1,11 @@
 import os
+import sys
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 SECRET_KEY = os.getenv("MY_SECRET_KEY", "secret_key")
 
-DEBUG = True
+DEBUG = os.getenv('YATUBE_DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -15,9 +16,31 @@ ALLOWED_HOSTS = [
     'slavajet.pythonanywhere.com',
 ]
 
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'redis': 'django_redis.cache.RedisCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+CACHE_LOCATIONS = {
+    'locmem': 'yatube',
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'memcached': '127.0.0.1:11211',
+    'redis': 'redis://127.0.0.1:6379/1',
+    'dummy': '',
+}
+
+CACHE_BACKEND = os.getenv('YATUBE_CACHE_BACKEND', 'locmem')
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv(
+            'YATUBE_CACHE_LOCATION', CACHE_LOCATIONS[CACHE_BACKEND]
+        ),
+        'KEY_PREFIX': os.getenv('YATUBE_CACHE_KEY_PREFIX', ''),
     }
 }
 
@@ -32,13 +55,18 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'tasks.apps.TasksConfig',
+    'notifications.apps.NotificationsConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -63,11 +91,28 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.notifications.unread_notifications',
             ],
         },
     },
 ]
 
+# Функции от пользователя, чьи значения входят в ETag страниц: например,
+# счетчик в шапке, который меняется без изменения самой страницы.
+PAGE_ETAG_USER_PARTS = [
+    'notifications.inbox.unread_count',
+]
+
+if not DEBUG:
+    # Скомпилированные шаблоны переиспользуются между запросами.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
@@ -77,6 +122,24 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: пути к файлам SQLite через запятую.
+# Реплицирует их внешний механизм, миграции идут на основную базу.
+DATABASE_REPLICAS = []
+
+for number, path in enumerate(
+    filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('YATUBE_REPLICA_PIN_SECONDS', '10'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME':
@@ -125,3 +188,35 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+METRICS_SAMPLE_RATE = float(os.getenv('YATUBE_METRICS_SAMPLE_RATE', '0.05'))
+
+METRICS_SLOW_REQUEST_MS = int(os.getenv('YATUBE_METRICS_SLOW_MS', '500'))
+
+# /metrics/ открыт только сотрудникам, адресам из списка и сборщику
+# с токеном в заголовке Authorization: Bearer <токен>. За прокси на том же
+# хосте все запросы приходят с 127.0.0.1, поэтому список по умолчанию пуст.
+METRICS_IPS = list(filter(
+    None, os.getenv('YATUBE_METRICS_IPS', '').split(',')
+))
+
+METRICS_TOKEN = os.getenv('YATUBE_METRICS_TOKEN', '')
+
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+# immediate — задачи выполняются сразу в запросе (для тестов: TestCase
+# не вызывает on_commit), local — в пуле потоков процесса, database —
+# в очереди в базе, которую разбирает run_tasks.
+TASKS_BROKER = os.getenv(
+    'YATUBE_TASKS_BROKER', 'immediate' if TESTING else 'local'
+)
+
+SITE_URL = os.getenv('YATUBE_SITE_URL', 'http://127.0.0.1:8000')
+
+# Независимые запросы вью (страница постов, подписка, рекомендации)
+# выполняются в пуле потоков; каждому потоку нужно свое соединение с базой.
+CONCURRENT_LOOKUPS = os.getenv('YATUBE_CONCURRENT_LOOKUPS', 'False') == 'True'
+
+LOOKUP_THREADS = int(os.getenv('YATUBE_LOOKUP_THREADS', '4'))
+
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', '16'))